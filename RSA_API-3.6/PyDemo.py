@@ -33,6 +33,19 @@ rsa300.SetReferenceLevel(rl)
 iqLen = aLen * 2
 floatArray = c_float * iqLen
 
+#the IQ buffer is allocated once and viewed through NumPy without copies:
+#I and Q are strided views and the interleaved floats are also complex64
+iqData = floatArray()
+iq = np.ctypeslib.as_array(iqData)
+iData = iq[0::2]
+qData = iq[1::2]
+z = iq.view(np.complex64)
+
+#FFT window and sample axis never change
+window = np.hanning(aLen)
+window = window / window.mean()
+x = np.linspace(0, aLen, aLen)
+
 #triggerMode = c_int(True)
 #rsa300.SetTriggerMode(triggerMode)
 trigPos = c_double(25.0)
@@ -41,38 +54,39 @@ rsa300.SetTriggerPositionPercent(trigPos)
 iqBW = c_double(40e6)
 rsa300.SetIQBandwidth(iqBW)
 
+#frequency axis, only rebuilt when the center frequency or bandwidth changes
+#the sample rate follows the IQ bandwidth, so it's read back on every rebuild
+sampleRate = c_double(56e6)
+freqAxis = {}
+def getFreqAxis():
+	key = (cf.value, iqBW.value)
+	if key not in freqAxis:
+		freqAxis.clear()
+		ret = rsa300.GetIQSampleRate(byref(sampleRate))
+		if ret != 0:
+			print "GetIQSampleRate error: " + str(ret)
+		offsets = np.fft.fftshift(np.fft.fftfreq(aLen, 1 / sampleRate.value))
+		freqAxis[key] = (cf.value + offsets) / 1e6
+	return freqAxis[key]
+
 def getIQData():
 	ready = c_bool(False)
 	
+	applyPending()
 	ret = rsa300.Run()
 	if ret != 0:
 			print "Run error: " + str(ret)
 	ret = rsa300.WaitForIQDataReady(10000, byref(ready))
 	if ret != 0:
 		print "WaitForIQDataReady error: " + str(ret)
-	iqData = floatArray()
 	startIndex = c_int(0)
 	if ready:
 		ret = rsa300.GetIQData(iqData, startIndex, length)
 		if ret != 0:
 			print "GetIQData error: " + str(ret)
-		iData = range(0,aLen)
-		qData = range(0,aLen)
-		for i in range(0,aLen):
-			iData[i] = iqData[i*2]
-			qData[i] = iqData[i*2+1]
-	
-	z = [(x + 1j*y) for x, y in zip(iData,qData)]
 	
-	cf = c_double(0)
-	rsa300.GetCenterFreq(byref(cf))
-	spec2 = mlab.specgram(z, NFFT=aLen, Fs=56e6)
-	f = [(x + cf)/1e6 for x in spec2[1]]
-	#close()
-	#r = spec2[0]
-	spec = np.fft.fft(z, aLen)
-	r = [x * 1 for x in abs(spec)]
-	r = np.fft.fftshift(r)
+	f = getFreqAxis()
+	r = np.fft.fftshift(np.abs(np.fft.fft(z * window)))
 	return [iData, qData, z, r, f]
 
 def init():
@@ -81,22 +95,23 @@ def init():
 	#line3.set_data([], [])
 	return line, line2, line3,
 
+lastAxis = [None]
 def update(i):
-	x = np.linspace(0, aLen, aLen)
 	iq = getIQData()
 	f = iq[4]
 	i = iq[0]
 	q = iq[1]
 	
 	r = iq[3]
-	#print iq[4][1][0:10]
 	line.set_data(x, i)
 	line2.set_data(x, q)
-	ax2.set_xlim(f[0], f[len(f) - 1])
 	line3.set_data(f, r)
 	
-	ax2.set_xticks( [ round(f[int(8.0/56*len(f))]), round(f[int(18.0/56*len(f))]), f[len(f)/2], round(f[int(38.0/56*len(f))]), round(f[int(48.0/56*len(f))]) ] )
-	#ax2.relim()
+	#only touch the axis limits and ticks when the frequency axis changes
+	if f is not lastAxis[0]:
+		lastAxis[0] = f
+		ax2.set_xlim(f[0], f[len(f) - 1])
+		ax2.set_xticks( [ round(f[int(8.0/56*len(f))]), round(f[int(18.0/56*len(f))]), f[len(f)/2], round(f[int(38.0/56*len(f))]), round(f[int(48.0/56*len(f))]) ] )
 	return line, line2, line3,
 	
 fig = figure()
@@ -119,67 +134,72 @@ line3, = ax2.plot([], [], lw=2)
 
 
 
+#client side copy of the settings: the handlers change the module level
+#values in place and queue the setter, getIQData() sends whatever actually
+#changed in one Stop/Set cycle before the next Run, so several clicks
+#between frames cost one round trip. Each value that was set is read back,
+#since the instrument may clamp or reject it
+trigMode = c_int(0)
+rsa300.GetTriggerMode(byref(trigMode))
+applied = {'SetCenterFreq': cf.value, 'SetReferenceLevel': rl.value,
+	'SetIQBandwidth': iqBW.value, 'SetTriggerMode': trigMode.value}
+pending = {}
+
+def applyPending():
+	changed = [(setter, value) for setter, value in pending.items() 
+		if applied[setter] != value.value]
+	pending.clear()
+	if changed:
+		rsa300.Stop()
+		for setter, value in changed:
+			ret = getattr(rsa300, setter)(value)
+			if ret != 0:
+				print setter + " error: " + str(ret)
+			getter = 'Get' + setter[3:]
+			ret = getattr(rsa300, getter)(byref(value))
+			if ret != 0:
+				print getter + " error: " + str(ret)
+			applied[setter] = value.value
+		updateLabels()
+
+def updateLabels():
+	ax.set_xlabel('CF = ' + str(cf.value / 1e6) + ' MHz')
+	ax2.set_xlabel('RefLevel = ' + str(rl.value) + ' dBm')
+	ax2.set_title('IQBandwith = ' + str(iqBW.value / 1e6) + ' MHz')
+
 def next(event):
-	rsa300.Stop()
-	cf = c_double(0)
-	rsa300.GetCenterFreq(byref(cf))
-	cf = c_double(cf.value + 10e6)
-	rsa300.SetCenterFreq(cf)
-	rsa300.Run()
+	cf.value = cf.value + 10e6
+	pending['SetCenterFreq'] = cf
 	ax.set_xlabel('CF = ' + str(cf.value / 1e6) + ' MHz')
 	
 def prev(event):
-	rsa300.Stop()
-	cf = c_double(0)
-	rsa300.GetCenterFreq(byref(cf))
-	cf = c_double(cf.value - 10e6)
-	rsa300.SetCenterFreq(cf)
-	rsa300.Run()
+	cf.value = cf.value - 10e6
+	pending['SetCenterFreq'] = cf
 	ax.set_xlabel('CF = ' + str(cf.value / 1e6) + ' MHz')
 	
 def up(event):
-	rsa300.Stop()
-	rl = c_double(0)
-	rsa300.GetReferenceLevel(byref(rl))
-	rl = c_double(rl.value + 5.0)
-	rsa300.SetReferenceLevel(rl)
-	rsa300.Run()
+	rl.value = rl.value + 5.0
+	pending['SetReferenceLevel'] = rl
 	ax2.set_xlabel('RefLevel = ' + str(rl.value) + ' dBm')
 	
 def down(event):
-	rsa300.Stop()
-	rl = c_double(0)
-	rsa300.GetReferenceLevel(byref(rl))
-	rl = c_double(rl.value - 5.0)
-	rsa300.SetReferenceLevel(rl)
-	rsa300.Run()
+	rl.value = rl.value - 5.0
+	pending['SetReferenceLevel'] = rl
 	ax2.set_xlabel('RefLevel = ' + str(rl.value) + ' dBm')
 
 def trigger(event):
-	rsa300.Stop()
-	trigMode = c_int(True)
-	rsa300.GetTriggerMode(byref(trigMode))
-	trigMode = c_int(not trigMode.value)
-	rsa300.SetTriggerMode(trigMode)
-	rsa300.Run()
+	trigMode.value = int(not trigMode.value)
+	pending['SetTriggerMode'] = trigMode
 	
 def more(event):
-	rsa300.Stop()
-	iqBQ = c_double(0)
-	rsa300.GetIQBandwidth(byref(iqBQ))
-	iqBQ = c_double(iqBQ.value * 2)
-	rsa300.SetIQBandwidth(iqBQ)
-	rsa300.Run()
-	ax2.set_title('IQBandwith = ' + str(iqBQ.value / 1e6) + ' MHz')
+	iqBW.value = iqBW.value * 2
+	pending['SetIQBandwidth'] = iqBW
+	ax2.set_title('IQBandwith = ' + str(iqBW.value / 1e6) + ' MHz')
 
 def less(event):
-	rsa300.Stop()
-	iqBQ = c_double(0)
-	rsa300.GetIQBandwidth(byref(iqBQ))
-	iqBQ = c_double(iqBQ.value / 2)
-	rsa300.SetIQBandwidth(iqBQ)
-	rsa300.Run()
-	ax2.set_title('IQBandwith = ' + str(iqBQ.value / 1e6) + ' MHz')
+	iqBW.value = iqBW.value / 2
+	pending['SetIQBandwidth'] = iqBW
+	ax2.set_title('IQBandwith = ' + str(iqBW.value / 1e6) + ' MHz')
 	
 	
 axbuttonNext = plt.axes([0.91, 0.02, 0.070, 0.05])
@@ -17,6 +17,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import os, time
+from settings_cache import dpx_axes
+from dpx_acquisition import get_sogram_lines
+from dpx_render import ColorMapper, LiveImage
 
 """
 ################################################################
@@ -185,14 +188,8 @@ def main():
     bitmapHeight = c_int(201)
     #bitmapSize = bitmapWidth.value*bitmapHeight.value
 
-    #for DPX_GetSogramHiResLine
-    intArray = c_int16*TRACEPOINTS
-    vData = intArray()
-    vDataSize = c_int32(0)
-    lineIndex = c_int32(0)
-    dataSF = c_double(0)
-    tracePoints = c_int32(TRACEPOINTS)
-    firstValidPoint = c_int32(0)
+    #DPX_GetSogramHiResLine writes into the rows of an int16 matrix
+    #allocated by get_sogram_lines()
 
     #for DPX_GetSogramHiResLineCount
     lineCount = c_int(0)
@@ -244,15 +241,14 @@ def main():
     rsa.DPX_GetSogramHiResLineCountLatest(byref(lineCount));
     numTraces = lineCount.value-1
     print('Lines in DPXogram: %d' % numTraces)
-    sogram = np.empty((numTraces,dsStruct.bitmapWidth))
 
-    for i in xrange(numTraces):
-        ret = rsa.DPX_GetSogramHiResLine(vData, byref(vDataSize), c_int32(i), 
-        byref(dataSF), tracePoints, firstValidPoint)
-        sogram[i] = np.ctypeslib.as_array(vData)
-
-    if ret != 0:
-        print('Error in DPX_GetSogramHiResLine: ' + str(ret))
+    #raw int16 lines, scaled to dBm only when they're read
+    try:
+        sogram = get_sogram_lines(rsa, numTraces, dsStruct.bitmapWidth)
+    except RuntimeError as e:
+        print(e)
+        rsa.DEVICE_Disconnect()
+        exit()
 
 
     """#################PROCESS DATA#################"""
@@ -269,22 +265,21 @@ def main():
 
 
     """#################PLOT#################"""
-    #create frequency array and scale DPXogram traces
-    sogramFreq = np.linspace((cf.value - fspan.value/2), (cf.value + fspan.value/2), 
-        dsStruct.bitmapWidth)
-    sogram = sogram*dataSF.value
+    #create frequency array, sogram[i] is scaled by its dataSF on the fly
+    sogramFreq = dpx_axes(dsStruct, cf.value, fspan.value, yBottom.value, 
+        yTop.value)[0]
 
-    #This plot is a composite 3D representation of all DPXogram traces
+    #all DPXogram traces drawn as one image, time going down
+    mapper = ColorMapper(sogram.raw.shape, sogram.min(), sogram.max())
     fig2 = plt.figure(figsize=(12,12))
-    ax2 = fig2.gca(projection='3d')
-    for i in xrange(numTraces):
-        ax2.plot(sogramFreq, sogram[i], i*timeResolution.value, 'b', zdir='y')
-    plt.title('DPXogram Traces')
-    plt.ylim(0, numTraces*timeResolution.value)
-    ax2.set_zlim(np.amin(sogram), np.amax(sogram))
+    ax2 = fig2.add_subplot(111)
+    image = LiveImage(ax2, mapper, (sogramFreq[0], sogramFreq[-1], 
+        numTraces*timeResolution.value, 0))
+    image.update(sogram.scaled())
+    plt.title('DPXogram Traces, %3.1f to %3.1f dBm' % (sogram.min(), 
+        sogram.max()))
     ax2.set_xlabel('Frequency (Hz)')
     ax2.set_ylabel('Time (sec)')
-    ax2.set_zlabel('Amplitude (dBm)')
     plt.show()
 
     #This commented section is a 3D representation of the DPXogram bitmap
@@ -15,8 +15,10 @@ Anaconda includes NumPy and MatPlotLib
 from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 import os, time
+from settings_cache import dpx_axes
+from dpx_acquisition import iter_dpx_frames, DPXStats, FramePool
+from dpx_render import ColorMapper, LiveImage
 
 """
 ################################################################
@@ -36,23 +38,6 @@ class DPX_SettingStruct(Structure):
     ('traceLength', c_int32), ('decayFactor', c_float),
     ('actualRBW', c_double)]
          
-#create DPX frame buffer data structure
-class DPX_FrameBuffer(Structure):
-        _fields_ = [('fftPerFrame', c_int32), ('fftCount', c_int64),
-        ('frameCount', c_int64), ('timestamp', c_double),
-        ('acqDataStatus', c_uint32), ('minSigDuration', c_double),
-        ('minSigDurOutOfRange', c_bool), ('spectrumBitmapWidth', c_int32), 
-        ('spectrumBitmapHeight', c_int32), ('spectrumBitmapSize', c_int32),
-        ('spectrumTraceLength', c_int32), ('numSpectrumTraces', c_int32),
-        ('spectrumEnabled', c_bool), ('spectrogramEnabled', c_bool),
-        ('spectrumBitmap', POINTER(c_float)), 
-        ('spectrumTraces', POINTER(POINTER(c_float))), 
-        ('sogramBitmapWidth', c_int32), ('sogramBitmapHeight',c_int32),
-        ('sogramBitmapSize', c_int32), ('sogramBitmapNumValidLines',c_int32),
-        ('sogramBitmap', POINTER(c_uint8)),
-        ('sogramBitmapTimestampArray', POINTER(c_double)), 
-        ('sogramBitmapContainTriggerArray', POINTER(c_double))]
-
 def search_connect():
     #search/connect variables
     numFound = c_int(0)
@@ -137,7 +122,6 @@ def main():
     TRACEPOINTS = 801
 
     dsStruct = DPX_SettingStruct()  #DPX Settings struct
-    fb = DPX_FrameBuffer()          #DPX frame buffer, this will contain data
 
     #SA setup
     cf = c_double(1e9)              #center freq
@@ -145,9 +129,8 @@ def main():
     
     #bools/timeouts
     enable = c_bool(True)           #DPX enable
-    frameAvailable = c_bool(False)  #DPX frame available check
-    ready = c_bool(False)           #ready check
     timeoutMsec = c_int(500)        #timeout
+    acqTime = 5                     #seconds of DPX frames to stream
 
     #for DPX_SetParameters
     fspan = c_double(40e6)
@@ -192,15 +175,22 @@ def main():
     print('\nDPX spectrum is being generated\n')
 
     #acquisition loop
+    #frames are streamed back to back for acqTime seconds, each one is a
+    #view into the API's frame buffer until the next one is fetched, so
+    #the last frame is copied into a pool slot to keep it for plotting
+    stats = DPXStats()
+    pool = FramePool(1, bitmapHeight.value, bitmapWidth.value, 3, TRACEPOINTS)
     rsa.DEVICE_Run()
     rsa.DPX_Reset()
 
-    while frameAvailable.value == False:
-        rsa.DPX_IsFrameBufferAvailable(byref(frameAvailable))
-        while ready.value == False:
-            rsa.DPX_WaitForDataReady(c_int(100), byref(ready))
-    rsa.DPX_GetFrameBuffer(byref(fb))
-    rsa.DPX_FinishFrameBuffer()
+    start = time.time()
+    frames = iter_dpx_frames(rsa, timeoutMsec.value, stats=stats)
+    for frame in frames:
+        if time.time() - start > acqTime:
+            slot = pool.keep(frame)
+            fb = frame.fb
+            break
+    frames.close()
 
     rsa.DEVICE_Stop()
 
@@ -208,41 +198,41 @@ def main():
     print('FFTs: {}'.format(fb.fftCount))
     print('Spectrum Traces: {}'.format(fb.numSpectrumTraces))
     print('Spectrum trace points: {}'.format(fb.spectrumTraceLength))
+    stats.flush()
+    for second in stats.latest():
+        print('%d: %d frames, %d FFTs, %d frames dropped' % (
+            second['timestamp'], second['frames'], second['ffts'], 
+            second['dropped']))
+    print('{} frames fetched, {} dropped.'.format(stats.frames, stats.dropped))
 
     """#################PROCESS DATA#################"""
-    specTraces = np.ctypeslib.as_array(fb.spectrumTraces, shape=(801, 3))
+    #the +peak, -peak and average traces of the kept frame
+    specTraces = pool.traces[slot]
 
-    plt.plot(specTraces[0:801])
+    plt.plot(specTraces.T)
     plt.show()
 
-    bitmapFreq = np.linspace((cf.value - fspan.value/2), (cf.value + fspan.value/2), 
-        fb.spectrumBitmapWidth)
-    bitmapAmp = np.linspace(yBottom.value, yTop.value, fb.spectrumBitmapHeight)
-
-    #grab spectrum bitmap
-    #specifying the shape of the destination variable is IMPORTANT
-    dpxBitmap = np.ctypeslib.as_array(fb.spectrumBitmap, 
-        shape=(fb.spectrumBitmapSize,))
-    dpxBitmap = dpxBitmap.reshape((fb.spectrumBitmapHeight, 
-        fb.spectrumBitmapWidth))
-
-
-    """#################PLOT#################"""    
-    #This plot is a 3D representation of the DPX bitmap that plots out
-    #each spectrum 
-    #The methodology was cobbled together from a few 
-    #different Matplotlib example files
-    #If anyone can figure out how to do a 3D colormap, that'd be cool.
-    fig2 = plt.figure(figsize=(12,12))
-    ax2 = fig2.gca(projection='3d')
-    for i in xrange(fb.spectrumBitmapHeight):
-        index = fb.spectrumBitmapHeight-1-i
-        ax2.plot(dpxBitmap[i], bitmapFreq, bitmapAmp[index], c='b')
+    bitmapFreq, bitmapAmp = dpx_axes(dsStruct, cf.value, fspan.value, 
+        yBottom.value, yTop.value)
+
+    #spectrum bitmap of the kept frame, (height, width)
+    dpxBitmap = pool.bitmaps[slot]
+
+
+    """#################PLOT#################"""
+    #the bitmap is drawn as one image, row 0 is the top of the screen
+    #hit counts span several decades, so the colors are on a log scale
+    #the same ColorMapper/LiveImage can redraw every streamed frame, or
+    #write_png(filename, mapper.render(dpxBitmap)) can save it headless
+    mapper = ColorMapper(dpxBitmap.shape, 0, max(np.amax(dpxBitmap), 1), log=True)
+    fig2 = plt.figure(figsize=(12,8))
+    ax2 = fig2.add_subplot(111)
+    image = LiveImage(ax2, mapper, (bitmapFreq[0], bitmapFreq[-1], 
+        yBottom.value, yTop.value))
+    image.update(dpxBitmap)
     plt.title('DPX Bitmap')
-    ax2.set_zlim(yBottom.value,yTop.value)
-    ax2.set_xlabel('Spectral Density (counter hits)')
-    ax2.set_ylabel('Frequency (Hz)')
-    ax2.set_zlabel('Amplitude (dBm)')
+    ax2.set_xlabel('Frequency (Hz)')
+    ax2.set_ylabel('Amplitude (dBm)')
     plt.show()
 
 
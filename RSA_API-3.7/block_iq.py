@@ -15,7 +15,8 @@ Anaconda includes NumPy and MatPlotLib
 from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
-import os
+import os, time
+from iq_acquisition import BlockIQAcquisition
 
 """
 ################################################################
@@ -86,20 +87,13 @@ def main():
     iqBandwidth = c_double(5e6)
     acqTime = 50e-3
     recordLength = c_int(int(iqBandwidth.value*1.4*acqTime))
+    numRecords = 10
 
-    actLength = c_int(0)
     trigMode = c_int(1)
     trigLevel = c_double(-10)
     trigSource = c_int(1)
     iqSampleRate = c_double(0)
     runMode = c_bool(False)
-    timeoutMsec = c_int(1000)
-    ready = c_bool(False)
-
-    #data transfer variables
-    iqArray =  c_float*recordLength.value
-    iData = iqArray()
-    qData = iqArray()
 
 
     """#################SEARCH/CONNECT#################"""
@@ -147,30 +141,31 @@ def main():
     if trigMode.value == 1:
         print('Waiting for trigger.')
 
-    rsa.IQBLK_AcquireIQData()
-    #check for data ready
-    while ready.value == False:
-        ret = rsa.IQBLK_WaitForIQDataReady(timeoutMsec, byref(ready))
-
-    #query I and Q data
-    rsa.IQBLK_GetIQDataDeinterleaved(byref(iData), byref(qData), byref(actLength), recordLength)
-    print('Got IQ data')
+    #records are acquired back to back into two reusable buffers
+    #the next record is being acquired while this loop handles the last one
+    acquisition = BlockIQAcquisition(rsa, recordLength.value, numBuffers=2)
+    acquisition.start()
+    start = time.clock()
+    for i in xrange(numRecords):
+        I, Q = acquisition.next_record()
+    end = time.clock()
+    #the views are only valid until the next record, keep a copy to plot
+    I = I.copy()
+    Q = Q.copy()
+    acquisition.stop()
+    print('Got {} IQ records in {} seconds.'.format(numRecords, end-start))
     rsa.DEVICE_Stop()
 
-    #convert ctypes array to numpy array for ease of use
-    I = np.ctypeslib.as_array(iData)
-    Q = np.ctypeslib.as_array(qData)
-
-    time = np.linspace(0,recordLength.value/iqSampleRate.value,recordLength.value)
+    t = np.linspace(0,recordLength.value/iqSampleRate.value,recordLength.value)
 
 
     """#################PLOTS#################"""
     plt.suptitle('I and Q vs Time', fontsize='20')
     plt.subplot(211, axisbg='k')
-    plt.plot(time*1e3, I, c='red')
+    plt.plot(t*1e3, I, c='red')
     plt.ylabel('I (V)')
     plt.subplot(212, axisbg='k')
-    plt.plot(time*1e3, Q, c='blue')
+    plt.plot(t*1e3, Q, c='blue')
     plt.xlabel('Time (msec)')
     plt.show()
 
@@ -16,6 +16,8 @@ from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from pulse_measurements import iq_to_dbm, measure_pulses
+from iq_acquisition import get_iq_data_complex, complex_empty
 
 """
 ################################################################
@@ -78,34 +80,6 @@ def search_connect():
         return selection
 
 
-def pulse_width_finder(data, thresh, startIndex):
-    dPoint = np.amax(data) - thresh
-    saved = data[startIndex]
-    risingIndex = startIndex
-    endIndex = len(data)
-    fallingIndex = endIndex - 1
-
-    for i in xrange(startIndex, endIndex):
-        if data[i] <= dPoint:
-            saved = data[i]
-        else:
-            if saved <= dPoint:
-                saved = data[i]
-                risingIndex = i
-                break
-
-    for j in xrange(risingIndex, endIndex):
-        if data[j] >= dPoint:
-            saved = data[j]
-        else:
-          if saved >= dPoint:
-            saved = data[j]
-            fallingIndex = j
-            break
-
-    return risingIndex, fallingIndex
-
-
 def main():
     """#################INITIALIZE VARIABLES#################"""
     #main SA parameters
@@ -115,10 +89,9 @@ def main():
     acqTime = 1e-3
     """
     NB: Record length is set below because it depends on the IQ sample rate.
-    Consequently, the iqArray data type is set below place for the same reason
+    Consequently, the iqData array is allocated below for the same reason
     """
 
-    actLength = c_int(0)
     trigMode = c_int(1)
     trigLevel = c_double(-10)
     trigSource = c_int(1)
@@ -139,9 +112,7 @@ def main():
 
     #record length dependent data transfer variables
     recordLength = c_int(int(iqSampleRate.value*acqTime))
-    iqArray =  c_float*recordLength.value
-    iData = iqArray()
-    qData = iqArray()
+    iqData = complex_empty(recordLength.value)
 
     rsa.CONFIG_SetReferenceLevel(refLevel)
     rsa.CONFIG_SetCenterFreq(cf)
@@ -187,52 +158,49 @@ def main():
     while ready.value == False:
         ret = rsa.IQBLK_WaitForIQDataReady(timeoutMsec, byref(ready))
 
-    #query I and Q data
-    rsa.IQBLK_GetIQDataDeinterleaved(byref(iData), byref(qData), byref(actLength), recordLength)
+    #query interleaved IQ data straight into a complex64 array
+    #I and Q are strided views of it, no copies are made
+    actLength, ret = get_iq_data_complex(rsa, iqData)
+    rsa.DEVICE_Stop()
+    if ret != 0:
+        print('Error in IQBLK_GetIQData: ' + str(ret))
+        rsa.DEVICE_Disconnect()
+        exit()
     print('Got IQ data')
     print('Processing pulse widths, please wait.')
-    rsa.DEVICE_Stop()
 
-    #convert ctypes array to numpy array for ease of use
-    I = np.ctypeslib.as_array(iData)
-    Q = np.ctypeslib.as_array(qData)
+    #only the samples the API actually wrote
+    iqData = iqData[:actLength]
+    I = iqData.real
+    Q = iqData.imag
 
     #power in dBm
-    #10log(Vrms^2/(R*1mW)
-    #There's an "extra" factor of 2 in the denominator from the RMS conversion
-    avt = 10*np.log10((I**2+Q**2)/(2*50*1e-3))
+    avt = iq_to_dbm(I, Q)
 
+    #find every pulse edge in one pass and measure the pulse parameters
+    #incomplete pulses at the start/end of the record are not reported
+    #I and Q can also be 2-D stacks of records to measure a batch at once
     thresh = 10
-    risingIndex = fallingIndex = 0
-    """
-    ########################################################
-    NB: NEVER INITIALIZE MULTIPLE VARIABLES SIMULTANEOUSLY
-    WITH EMPTY LISTS IN PYTHON. THEY SHARE THE SAME MEMORY
-    AND CAUSE ALL SORTS OF ISSUES.
-    ########################################################
-    """
-    pulseWidth = []
-    pwRisingIndices = []
-    pwFallingIndices = []
-    time = np.linspace(0,recordLength.value/iqSampleRate.value,recordLength.value)
-
-    #find pulse edge indices and convert to pulse width
-    while fallingIndex < (recordLength.value-1):
-        risingIndex, fallingIndex = pulse_width_finder(avt, thresh, fallingIndex)
-        pwRisingIndices.append(risingIndex)
-        pwFallingIndices.append(fallingIndex)
-        pulseWidth.append(time[fallingIndex] - time[risingIndex])
-      
-    #remove first/last pulses, usually outliers. delete/comment this if you like
-    try:
-        del(pulseWidth[0])
-        del(pulseWidth[-1])
-        for i in xrange(len(pulseWidth)):
-            print('Pulse {0} width: {1:.9f} sec'.format(i, (pulseWidth[i])))
-            print('Average pulse width: {} seconds'.format(np.mean(pulseWidth)))
-            print('Number of pulses detected: {}'.format(len(pulseWidth)-1))
-    except IndexError:
-        print('1 or fewer pulses detected.')
+    hysteresis = 1
+    time = np.arange(actLength)/iqSampleRate.value
+    pulses = measure_pulses(I, Q, iqSampleRate.value, thresh, hysteresis)
+    pwRisingIndices = pulses.risingIndex
+    pwFallingIndices = pulses.fallingIndex
+
+    if len(pulses) > 0:
+        for i in xrange(len(pulses)):
+            print('Pulse {0} width: {1:.9f} sec, PRI: {2:.9f} sec, '
+                'duty cycle: {3:.4f}'.format(i, pulses.width[i], pulses.pri[i], 
+                pulses.dutyCycle[i]))
+            print('    rise time: {0:.9f} sec, fall time: {1:.9f} sec, '
+                'droop: {2:.2f}%'.format(pulses.riseTime[i], 
+                pulses.fallTime[i], pulses.droop[i]))
+            print('    peak power: {0:.2f} dBm, average power: {1:.2f} '
+                'dBm'.format(pulses.peakPower[i], pulses.avgPower[i]))
+        print('Average pulse width: {} seconds'.format(np.mean(pulses.width)))
+        print('Number of pulses detected: {}'.format(len(pulses)))
+    else:
+        print('No complete pulses detected.')
   
 
     """#################PLOTS#################"""
@@ -242,7 +210,7 @@ def main():
     plt.plot(time*1e3,avt, c='yellow')
     plt.ylabel('Amplitude (dBm)')
     plt.xlabel('Time (msec)')
-    for i in xrange(len(pwRisingIndices)-1):
+    for i in xrange(len(pwRisingIndices)):
         plt.axvline(x=time[pwRisingIndices[i]]*1e3, c='red')
         plt.axvline(x=time[pwFallingIndices[i]]*1e3, c='blue')
     plt.show()
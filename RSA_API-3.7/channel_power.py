@@ -0,0 +1,105 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Channel Power and ACPR
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Integrated power in any number of channels of a spectrum trace, and
+adjacent channel power ratios. Each channel is turned into a row of bin
+weights once per spectrum settings, so the power in every channel of a
+whole batch of traces comes out of a single matrix multiply.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+from spectrum_measurements import trace_to_mw
+from settings_cache import SettingsCache, frequency_axis
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+class ChannelPower(object):
+    """
+    Power in a set of channels given as center offsets from the center
+    frequency and bandwidths, both in Hz. With relative=False the offsets
+    are absolute center frequencies instead.
+
+    Each trace point is treated as the power in a bin one frequency step
+    wide, so a bin cut by a channel edge counts with the fraction of it
+    that lies inside the channel. The parts of a channel outside the span
+    aren't measured.
+    """
+    def __init__(self, offsets, bandwidths, relative=True):
+        self.offsets = np.asarray(offsets, dtype=np.float64)
+        #a single bandwidth applies to every channel
+        self.bandwidths = np.zeros_like(self.offsets) + bandwidths
+        self.relative = relative
+        self._weights = SettingsCache(4)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def weights(self, specSet):
+        """
+        Returns the (channels, traceLength) matrix of bin weights for
+        specSet. It's only recomputed for settings that weren't used
+        recently.
+        """
+        return self._weights.get('channels', specSet, 
+            lambda: self._bin_weights(specSet))
+
+    def _bin_weights(self, specSet):
+        freq = frequency_axis(specSet)
+        df = specSet.actualFreqStepSize
+        centers = self.offsets
+        if self.relative:
+            centers = centers + (specSet.actualStartFreq + 
+                specSet.actualStopFreq)/2.0
+
+        #overlap of each bin with each channel, as a fraction of the bin
+        chLo = (centers - self.bandwidths/2.0)[:, np.newaxis]
+        chHi = (centers + self.bandwidths/2.0)[:, np.newaxis]
+        overlap = np.minimum(freq + df/2.0, chHi) - np.maximum(
+            freq - df/2.0, chLo)
+        return np.clip(overlap/df, 0, 1)
+
+    def measure_mw(self, traces, specSet):
+        #channel powers in mW, shape traces.shape[:-1] + (channels,)
+        return np.dot(trace_to_mw(traces, specSet), self.weights(specSet).T)
+
+    def measure(self, traces, specSet):
+        """
+        Channel powers in dBm of one trace or a 2-D array of traces (one
+        per row). Returns one value per channel, or one row of them per
+        trace.
+        """
+        return 10*np.log10(self.measure_mw(traces, specSet))
+
+    def acpr(self, traces, specSet, reference=0):
+        """
+        Channel powers in dB relative to channel number reference, the main
+        channel. Returns (acpr, refPower) with refPower in dBm; the
+        reference channel's own entry in acpr is 0.
+        """
+        power = self.measure(traces, specSet)
+        refPower = power[..., reference]
+        return power - refPower[..., np.newaxis], refPower
+
+
+def adjacent_channels(bandwidth, spacing, numAdjacent=1, adjBandwidth=None):
+    """
+    Offsets and bandwidths for a main channel at the center frequency and
+    numAdjacent channels on each side, spacing Hz apart. adjBandwidth
+    defaults to the main channel's bandwidth. The channels come out lowest
+    first, so the main channel is number numAdjacent.
+    """
+    if adjBandwidth is None:
+        adjBandwidth = bandwidth
+    offsets = spacing*np.arange(-numAdjacent, numAdjacent + 1, dtype=np.float64)
+    bandwidths = np.full(len(offsets), adjBandwidth, dtype=np.float64)
+    bandwidths[numAdjacent] = bandwidth
+    return offsets, bandwidths
@@ -0,0 +1,234 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Parallel Chunk Processing
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Post-processing of streamed capture files on every CPU core. A capture is
+split into chunks of samples, each read with enough extra samples before
+and after it for the FFT or filter to settle, and the chunks are handed
+to a multiprocessing.Pool. Workers get only the file name and the sample
+range and read the samples through the stream_file_readers memmap, so
+nothing large is pickled and each worker holds about one chunk at a time.
+Results come back in order and are joined into one array.
+
+The functions given to the pool must be defined at the top level of a
+module, and on Windows the calling script must start its work from under
+if __name__ == "__main__": since every worker imports it.
+This file doesn't load RSA_API.dll, it only works on files.
+"""
+
+import numpy as np
+import multiprocessing
+from stream_file_readers import open_stream_file
+from settings_cache import window_weights
+from pulse_measurements import iq_to_mw, hysteresis_state
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#start/stop is the range of samples a chunk produces results for,
+#readStart/readStop the range it reads, including the overlap
+CHUNK_DTYPE = np.dtype([('start', np.int64),
+    ('stop', np.int64),
+    ('readStart', np.int64),
+    ('readStop', np.int64)])
+
+#one entry per edge found by burst_edges()
+EDGE_DTYPE = np.dtype([('index', np.int64), ('rising', np.bool_)])
+
+#one entry per burst returned by merge_bursts(), indices are in samples
+BURST_DTYPE = np.dtype([('risingIndex', np.int64),
+    ('fallingIndex', np.int64),
+    ('width', np.int64)])
+
+#files opened by this worker process, kept open between chunks
+_files = {}
+
+
+def plan_chunks(numberSamples, chunkSize, before=0, after=0, align=1):
+    """
+    Splits numberSamples into back to back chunks of chunkSize samples
+    (rounded down to a multiple of align, so block or FFT hop boundaries
+    line up between chunks). Each chunk reads before samples ahead of its
+    start and after samples past its stop, clipped to the file.
+    Returns a CHUNK_DTYPE array.
+    """
+    chunkSize = max(chunkSize//align, 1)*align
+    start = np.arange(0, numberSamples, chunkSize, dtype=np.int64)
+    chunks = np.zeros(len(start), dtype=CHUNK_DTYPE)
+    chunks['start'] = start
+    chunks['stop'] = np.minimum(start + chunkSize, numberSamples)
+    chunks['readStart'] = np.maximum(start - before, 0)
+    chunks['readStop'] = np.minimum(chunks['stop'] + after, numberSamples)
+    return chunks
+
+
+def _open(filename):
+    if filename not in _files:
+        _files[filename] = open_stream_file(filename)
+    return _files[filename]
+
+
+def _run_chunk(task):
+    #runs in the worker: read the chunk's samples and process them
+    filename, func, chunk, args = task
+    streamFile = _open(filename)
+    data = streamFile.read(int(chunk['readStart']),
+        int(chunk['readStop'] - chunk['readStart']))
+    return func(data, chunk, streamFile, *args)
+
+
+def imap_file(filename, func, chunkSize=2**20, before=0, after=0, align=1,
+    args=(), processes=None):
+    """
+    Generator of func(data, chunk, streamFile, *args) for every chunk of
+    filename, in file order. data holds the samples from chunk['readStart']
+    to chunk['readStop'] as returned by StreamFile.read() and streamFile
+    is the worker's open file (for sampleRate, scale...). Results are
+    yielded as they come in, so they can be written out or reduced
+    without keeping them all. processes=None uses every core, 1 runs
+    everything in this process.
+    """
+    streamFile = open_stream_file(filename)
+    chunks = plan_chunks(len(streamFile), chunkSize, before, after, align)
+    if processes == 1:
+        for chunk in chunks:
+            data = streamFile.read(int(chunk['readStart']),
+                int(chunk['readStop'] - chunk['readStart']))
+            yield func(data, chunk, streamFile, *args)
+        streamFile.close()
+        return
+    streamFile.close()
+
+    tasks = [(filename, func, chunk, args) for chunk in chunks]
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(_run_chunk, tasks):
+            yield result
+        pool.close()
+    finally:
+        #also reached when the caller stops iterating early
+        pool.terminate()
+        pool.join()
+
+
+def process_file(filename, func, chunkSize=2**20, before=0, after=0, align=1,
+    args=(), processes=None, merge=np.concatenate):
+    #imap_file() with the ordered results joined by merge (None for a list)
+    results = list(imap_file(filename, func, chunkSize, before, after, align,
+        args, processes))
+    if merge is None:
+        return results
+    return merge(results)
+
+
+def _keep(data, chunk):
+    #the samples the chunk produces results for, without the overlap
+    offset = int(chunk['start'] - chunk['readStart'])
+    return data[offset:offset + int(chunk['stop'] - chunk['start'])]
+
+
+def power_vs_time(data, chunk, streamFile, blockSize):
+    """
+    Average power in dBm of every whole block of blockSize IQ samples.
+    Use with align=blockSize and no overlap.
+    """
+    data = _keep(data, chunk)
+    numBlocks = len(data)//blockSize
+    blocks = data[:numBlocks*blockSize].reshape(numBlocks, blockSize)
+    return 10*np.log10(iq_to_mw(blocks.real, blocks.imag).mean(axis=1))
+
+
+def spectrogram(data, chunk, streamFile, fftSize, hop, average=1):
+    """
+    Spectrogram rows in dBm per bin, fftshifted so DC is in the middle,
+    for FFT frames every hop samples, with average frames power averaged
+    into each row. Use with align=hop*average and after=fftSize - hop so
+    the last frames of a chunk can read into the next one.
+    """
+    offset = int(chunk['start'] - chunk['readStart'])
+    numFrames = int(chunk['stop'] - chunk['start'])//hop
+    numFrames = min(numFrames, (len(data) - offset - fftSize)//hop + 1)
+    numRows = max(numFrames, 0)//average
+    data = np.ascontiguousarray(data[offset:])
+    #overlapping frames as a strided view, no copy
+    frames = np.lib.stride_tricks.as_strided(data,
+        shape=(numRows*average, fftSize),
+        strides=(hop*data.strides[0], data.strides[0]))
+
+    window = window_weights(fftSize)
+    spectrum = np.fft.fft(frames*window, axis=1)/fftSize
+    mw = (spectrum.real**2 + spectrum.imag**2)/(2*50*1e-3)
+    mw = mw.reshape(numRows, average, fftSize).mean(axis=1)
+    return np.fft.fftshift(10*np.log10(mw), axes=1).astype(np.float32)
+
+
+def burst_edges(data, chunk, streamFile, level, hysteresis=1.0):
+    """
+    Rising and falling edges of the power envelope through level dBm,
+    with the same hysteresis band as pulse_measurements.find_pulse_edges(),
+    for the samples of the chunk (no overlap is needed).
+
+    Samples inside the band keep the state of the previous chunk, which a
+    worker can't know, so the state before the first sample outside the
+    band is left to merge_bursts(). Returns (edges, firstIndex,
+    firstState, lastState): the EDGE_DTYPE edges after that first sample,
+    its absolute index (-1 if the whole chunk is inside the band) and the
+    state there and at the end of the chunk.
+    """
+    data = _keep(data, chunk)
+    #compared in mW so empty samples don't need a log of zero
+    mw = iq_to_mw(data.real, data.imag)
+    upper = 10**((level + hysteresis/2.0)/10)
+    lower = 10**((level - hysteresis/2.0)/10)
+    decided = (mw > upper) | (mw < lower)
+    if not decided.any():
+        return np.zeros(0, dtype=EDGE_DTYPE), -1, 0, 0
+
+    state = hysteresis_state(mw[np.newaxis], upper, lower)[0]
+    changes = np.diff(state)
+    cols = np.nonzero(changes)[0]
+    edges = np.zeros(len(cols), dtype=EDGE_DTYPE)
+    edges['index'] = cols + 1 + chunk['start']
+    edges['rising'] = changes[cols] == 1
+    first = np.argmax(decided)
+    return edges, int(first + chunk['start']), int(state[first]), int(state[-1])
+
+
+def merge_bursts(results):
+    """
+    Joins the burst_edges() of every chunk, in file order, into a
+    BURST_DTYPE array of complete bursts. The state at the end of each
+    chunk is carried into the next, so an edge at the first decided
+    sample of a chunk is found even when the burst started or ended
+    chunks earlier. A burst already on at the start of the file or still
+    on at the end is not reported.
+    """
+    parts = []
+    carried = None
+    for edges, firstIndex, firstState, lastState in results:
+        if firstIndex < 0:
+            continue
+        if carried is not None and firstState != carried:
+            edge = np.zeros(1, dtype=EDGE_DTYPE)
+            edge['index'] = firstIndex
+            edge['rising'] = firstState == 1
+            parts.append(edge)
+        parts.append(edges)
+        carried = lastState
+    edges = np.concatenate(parts) if parts else np.zeros(0, dtype=EDGE_DTYPE)
+
+    #edges alternate, so dropping a leading falling edge leaves pairs
+    if len(edges) and not edges['rising'][0]:
+        edges = edges[1:]
+    numBursts = len(edges)//2
+    bursts = np.zeros(numBursts, dtype=BURST_DTYPE)
+    bursts['risingIndex'] = edges['index'][0:2*numBursts:2]
+    bursts['fallingIndex'] = edges['index'][1:2*numBursts:2]
+    bursts['width'] = bursts['fallingIndex'] - bursts['risingIndex']
+    return bursts
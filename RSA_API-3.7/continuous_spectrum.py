@@ -16,6 +16,13 @@ from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
 import os, time
+from spectrum_acquisition import SpectrumWorker
+from ring_buffer import PeakHistory
+from trace_detector import TraceDetector
+from spectrum_measurements import find_peaks
+from waterfall import Waterfall
+from dpx_render import ColorMapper, LiveImage
+from settings_cache import frequency_axis
 
 """
 ################################################################
@@ -125,7 +132,14 @@ def main():
     trace = c_int(0)            #select Trace 1 
     detector = c_int(1)         #set detector type to max
     acqTime = 10                 #time to run script\
-    end = -1024
+    maxFps = 20                  #display frame rate cap
+    tsRate = c_uint64(0)         #timestamp counts per second
+    #trace averaging/hold: 'linear', 'log', 'exponential', 'maxhold', 
+    #'minhold' or 'window', None to display the raw traces
+    avgMode = 'linear'
+    avgCount = 10
+    numPeaks = 5                 #peaks marked on the plot
+    waterfallHeight = 200        #traces shown in the waterfall
 
 
     """#################SEARCH/CONNECT#################"""
@@ -165,78 +179,127 @@ def main():
 
 
     """#################INITIALIZE DATA TRANSFER VARIABLES#################"""
-    #initialize variables for GetTrace
-    traceArray = c_float * specSet.traceLength
-    traceData = traceArray()
-    outTracePoints = c_int()
+    #traces are fetched by a SpectrumWorker thread into its own arrays
 
     #generate frequency array for plotting the spectrum
-    freq = np.arange(specSet.actualStartFreq, 
-        specSet.actualStartFreq + specSet.actualFreqStepSize*specSet.traceLength, 
-        specSet.actualFreqStepSize)
-    ppow = np.zeros(100e3)
-    ppf = np.zeros(100e3)
+    freq = frequency_axis(specSet)
+
+    #peak power/frequency of every trace, in constant memory
+    #with min/max/mean rollups per second and per minute
+    rsa.REFTIME_GetTimestampRate(byref(tsRate))
+    peaks = PeakHistory(100000, rollupPeriods=(1, 60))
+
+    #raw traces and timestamps for the waterfall display, in constant memory
+    waterfall = Waterfall(waterfallHeight, specSet.traceLength)
+    waterfallImage = np.full((waterfallHeight, specSet.traceLength), 
+        refLevel.value-100, dtype=np.float32)
+
+    #runs on every trace in place, no allocation per trace
+    if avgMode is not None:
+        traceDetector = TraceDetector(specSet.traceLength, avgMode, avgCount)
 
     
     #prepare plot window for periodic updates
-    plt.figure(selection)
-    plt.subplot(111, axisbg='k')
-    specPlot,  = plt.plot([], [], 'y')
+    fig = plt.figure(selection)
+    plt.subplot(211, axisbg='k')
+    specPlot,  = plt.plot(freq, np.zeros(len(freq)), 'y')
     plt.xlabel('Frequency (Hz)')
     plt.ylabel('Amplitude (dBm)')
     plt.title('Spectrum')
     peakFreqLine = plt.axvline(x=0)
-    peakPowerText = plt.text(0,0,'')
+    peakMarkers, = plt.plot([], [], 'rv')
+    text_x = specSet.actualStartFreq + specSet.span/20
+    peakPowerText = plt.text(text_x, 0, '', color='white')
     plt.show(block=False) #required to update plot w/o stopping the script
     plt.xlim(np.amin(freq), np.amax(freq))
     plt.ylim(refLevel.value-100, refLevel.value)
+
+    #waterfall below the spectrum, newest trace at the top
+    ax = plt.subplot(212)
+    mapper = ColorMapper(waterfallImage.shape, refLevel.value-100, refLevel.value)
+    waterfallPlot = LiveImage(ax, mapper, (freq[0], freq[-1], 
+        waterfallHeight, 0))
+    plt.xlabel('Frequency (Hz)')
+    plt.ylabel('Traces ago')
     
 
     """#################ACQUIRE/PROCESS DATA#################"""
-    #start acquisition
-    spectrums = 0
+    #acquisition runs in its own thread and queues every trace
+    #this loop analyzes every queued trace but only redraws the plot
+    #at up to maxFps with the newest one, older traces are never drawn
+    spectrums = frames = 0
     rsa.DEVICE_Run()
-    start = time.clock()
-    while end - start < acqTime:
-        rsa.SPECTRUM_AcquireTrace()
-        while ready.value == False:
-            rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
-        ready.value = False
-        rsa.SPECTRUM_GetTrace(c_int(0), specSet.traceLength, 
-            byref(traceData), byref(outTracePoints))
-        spectrums += 1
+    worker = SpectrumWorker(rsa, specSet.traceLength)
+    worker.start()
+    start = time.time()
+    nextFrame = start
+    latest = None
+    while time.time() - start < acqTime:
+        for traceData, timestamp, acqDataStatus in worker.drain(timeout=0.1):
+            spectrums += 1
+            #calculate peak power and frequency
+            peakIndex = np.argmax(traceData)
+            peakPower = traceData[peakIndex]
+            peakPowerFreq = freq[peakIndex]
+            peaks.append(float(timestamp)/tsRate.value, peakPower, 
+                peakPowerFreq, acqDataStatus)
+            waterfall.append(traceData, float(timestamp)/tsRate.value)
+            if avgMode is not None:
+                traceData = traceDetector.update(traceData)
+            latest = (traceData, peakPower, peakPowerFreq)
+
+        if latest is None or time.time() < nextFrame:
+            continue
+        nextFrame = time.time() + 1.0/maxFps
         
         
         """#################SPECTRUM PLOT#################"""
-        #update spectrum trace
-        peakFreqLine.remove()
-        peakPowerText.remove()
-        if spectrums == 1:
-            specPlot.set_xdata(freq)
+        #update spectrum trace and annotation in place
+        traceData, peakPower, peakPowerFreq = latest
+        latest = None
         specPlot.set_ydata(traceData)
-        
-        #calculate and annotate peak power and frequency
-        peakPower = np.amax(traceData)
-        peakPowerFreq = freq[np.argmax(traceData)]
-        print('Peak power in spectrum: %4.3f dBm @ %d Hz' % 
-            (peakPower, peakPowerFreq))
-        
-        peakFreqLine = plt.axvline(x=peakPowerFreq)
-        text_x = specSet.actualStartFreq + specSet.span/20
-        peakPowerText = plt.text(text_x, peakPower, 
-            'Peak power in spectrum: %4.3f dBm @ %5.4f MHz' % 
-            (peakPower, peakPowerFreq/1e6), color='white')
-        
-        plt.draw()
-        end = time.clock()
+        peakFreqLine.set_xdata([peakPowerFreq, peakPowerFreq])
+        peakPowerText.set_y(peakPower)
+        peakPowerText.set_text('Peak power in spectrum: %4.3f dBm @ %5.4f MHz' % 
+            (peakPower, peakPowerFreq/1e6))
+        #peak search only on the displayed trace
+        peakTable = find_peaks(traceData, freq, numPeaks, excursion=6, 
+            threshold=refLevel.value-80)
+        peakMarkers.set_data(peakTable.freq, peakTable.power)
+        #waterfall rows are views of the ring buffer, newest drawn on top
+        rows, timestamps = waterfall.latest()
+        waterfallImage[:len(rows)] = rows[::-1]
+        waterfallPlot.update(waterfallImage)
+        fig.canvas.draw()
+        fig.canvas.flush_events()
+        frames += 1
+
+    end = time.time()
+    worker.stop()
 
     #comment this out if you want the plot to stay until the script finishes
     rsa.DEVICE_Stop()
     plt.close()    
     print('Disconnecting.')
-    print('{} spectrums in {} seconds: {} spectrums per second.'.format(spectrums, acqTime, spectrums/acqTime))
-    sps = float(acqTime)/spectrums
-    print('Also {} seconds per trace.'.format(sps))
+    elapsed = end - start
+    print('{} spectrums acquired in {} seconds: {} spectrums per second.'.format(
+        worker.acquired, elapsed, worker.acquired/elapsed))
+    print('{} spectrums analyzed, {} dropped by the acquisition queue.'.format(
+        spectrums, worker.dropped))
+    print('{} frames displayed: {} frames per second.'.format(frames, 
+        frames/elapsed))
+
+    #summarize the peak history instead of printing every trace
+    peaks.flush()
+    history = peaks.latest()
+    if len(history) > 0:
+        maxIndex = np.argmax(history['peakPower'])
+        print('Max peak power: %4.3f dBm @ %d Hz' % 
+            (history['peakPower'][maxIndex], history['peakFreq'][maxIndex]))
+    for second in peaks.rollup(1):
+        print('%d: peak power min %4.3f, max %4.3f, mean %4.3f dBm over %d traces' % 
+            (second['timestamp'], second['minPower'], second['maxPower'], 
+            second['meanPower'], second['count']))
     rsa.DEVICE_Disconnect()
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: DPX Acquisition
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+DPX data straight into preallocated NumPy arrays. DPX frames are streamed
+continuously as zero-copy views of the API's frame buffer, with per second
+frame/FFT/dropped frame counts. DPXogram lines are fetched with
+DPX_GetSogramHiResLine() directly into the rows of one int16 matrix and
+kept as raw int16 with their scale factors, which takes a quarter of the
+memory of scaled float64 lines.
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected.
+"""
+
+from ctypes import *
+import numpy as np
+import time
+from ring_buffer import RingBuffer
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#create DPX frame buffer data structure
+class DPX_FrameBuffer(Structure):
+    _fields_ = [('fftPerFrame', c_int32), ('fftCount', c_int64),
+    ('frameCount', c_int64), ('timestamp', c_double),
+    ('acqDataStatus', c_uint32), ('minSigDuration', c_double),
+    ('minSigDurOutOfRange', c_bool), ('spectrumBitmapWidth', c_int32), 
+    ('spectrumBitmapHeight', c_int32), ('spectrumBitmapSize', c_int32),
+    ('spectrumTraceLength', c_int32), ('numSpectrumTraces', c_int32),
+    ('spectrumEnabled', c_bool), ('spectrogramEnabled', c_bool),
+    ('spectrumBitmap', POINTER(c_float)), 
+    ('spectrumTraces', POINTER(POINTER(c_float))), 
+    ('sogramBitmapWidth', c_int32), ('sogramBitmapHeight',c_int32),
+    ('sogramBitmapSize', c_int32), ('sogramBitmapNumValidLines',c_int32),
+    ('sogramBitmap', POINTER(c_uint8)),
+    ('sogramBitmapTimestampArray', POINTER(c_double)), 
+    ('sogramBitmapContainTriggerArray', POINTER(c_double))]
+
+#one entry per second in DPXStats
+DPX_STATS_DTYPE = np.dtype([('timestamp', np.float64),
+    ('frames', np.int32),
+    ('ffts', np.int64),
+    ('dropped', np.int32)])
+
+
+class DPXFrame(object):
+    """
+    One DPX frame. fb is the DPX_FrameBuffer, bitmap the spectrum bitmap
+    as a (height, width) float32 view and traces a list of float32 views,
+    one per spectrum trace, all pointing into the API's frame buffer.
+    They're only valid until the frame is finished, i.e. until the frame
+    iterator moves on; use a FramePool to keep a frame.
+    """
+    def __init__(self):
+        self.fb = DPX_FrameBuffer()
+        self.bitmap = None
+        self.traces = []
+        self._key = None
+
+    def _update_views(self):
+        #the views only need rebuilding when the API's buffers move
+        fb = self.fb
+        if not fb.spectrumEnabled or fb.spectrumBitmapSize <= 0:
+            self.bitmap = None
+            self.traces = []
+            self._key = None
+            return
+        key = (cast(fb.spectrumBitmap, c_void_p).value,
+            fb.spectrumBitmapHeight, fb.spectrumBitmapWidth,
+            fb.spectrumTraceLength, tuple(cast(fb.spectrumTraces[i], 
+            c_void_p).value for i in xrange(fb.numSpectrumTraces)))
+        if key != self._key:
+            self.bitmap = np.ctypeslib.as_array(fb.spectrumBitmap, 
+                shape=(fb.spectrumBitmapHeight, fb.spectrumBitmapWidth))
+            self.traces = [np.ctypeslib.as_array(fb.spectrumTraces[i], 
+                shape=(fb.spectrumTraceLength,)) 
+                for i in xrange(fb.numSpectrumTraces)]
+            self._key = key
+
+
+class DPXStats(object):
+    """
+    Frames fetched, FFTs and frames dropped per second of wall clock time,
+    for the last capacity seconds. A frame is dropped when the API made it
+    (frameCount moved on) but it was never fetched.
+    """
+    def __init__(self, capacity=86400):
+        self.history = RingBuffer(capacity, DPX_STATS_DTYPE)
+        self.frames = 0
+        self.dropped = 0
+        self._second = None
+        self._stored = False
+        self._lastFrame = None
+        self._lastFft = None
+
+    def update(self, fb, now=None):
+        if now is None:
+            now = time.time()
+        second = np.floor(now)
+        if second != self._second:
+            self.flush()
+            self._second = second
+            self._stored = False
+            self._row = [second, 0, 0, 0]
+        row = self._row
+        row[1] += 1
+        self.frames += 1
+        if self._lastFrame is not None:
+            dropped = max(fb.frameCount - self._lastFrame - 1, 0)
+            row[2] += fb.fftCount - self._lastFft
+            row[3] += dropped
+            self.dropped += dropped
+        self._lastFrame = fb.frameCount
+        self._lastFft = fb.fftCount
+
+    def flush(self):
+        #stores the partially filled current second, frames that still
+        #arrive in it update the same row
+        if self._second is not None:
+            if self._stored:
+                self.history.replace_last(tuple(self._row))
+            else:
+                self.history.append(tuple(self._row))
+                self._stored = True
+
+    def latest(self, n=None):
+        return self.history.latest(n)
+
+
+def iter_dpx_frames(rsa, timeoutMsec=100, stop=None, stats=None):
+    """
+    Generator of DPXFrame for every DPX frame, back to back.
+    Each frame is fetched with DPX_GetFrameBuffer() and finished with
+    DPX_FinishFrameBuffer() when the caller asks for the next one, so its
+    views stay valid while the caller works on it. The same DPXFrame is
+    yielded every time. Frames are counted into stats (a DPXStats) if
+    given. Iteration ends when the optional threading.Event stop is set.
+    Send DEVICE_Run() and DPX_Reset() first.
+    """
+    frame = DPXFrame()
+    ready = c_bool(False)
+    timeoutMsec = c_int(timeoutMsec)
+    while stop is None or not stop.is_set():
+        ready.value = False
+        while ready.value == False:
+            rsa.DPX_WaitForDataReady(timeoutMsec, byref(ready))
+            if stop is not None and stop.is_set():
+                return
+        ret = rsa.DPX_GetFrameBuffer(byref(frame.fb))
+        if ret != 0:
+            raise RuntimeError('Error in DPX_GetFrameBuffer: {}'.format(ret))
+        frame._update_views()
+        if stats is not None:
+            stats.update(frame.fb)
+        try:
+            yield frame
+        finally:
+            rsa.DPX_FinishFrameBuffer()
+
+
+class FramePool(object):
+    """
+    numSlots preallocated copies of DPX frames (bitmap, traces, frameCount,
+    timestamp). keep() copies a frame into the next slot, overwriting the
+    oldest, and returns the slot number.
+    """
+    def __init__(self, numSlots, bitmapHeight, bitmapWidth, numTraces=3, 
+        traceLength=801):
+        self.bitmaps = np.zeros((numSlots, bitmapHeight, bitmapWidth), 
+            dtype=np.float32)
+        self.traces = np.zeros((numSlots, numTraces, traceLength), 
+            dtype=np.float32)
+        self.frameCount = np.zeros(numSlots, dtype=np.int64)
+        self.timestamp = np.zeros(numSlots, dtype=np.float64)
+        self.kept = 0
+
+    def keep(self, frame):
+        slot = self.kept % len(self.bitmaps)
+        if frame.bitmap is not None:
+            self.bitmaps[slot] = frame.bitmap
+        for i, trace in enumerate(frame.traces[:self.traces.shape[1]]):
+            self.traces[slot, i] = trace
+        self.frameCount[slot] = frame.fb.frameCount
+        self.timestamp[slot] = frame.fb.timestamp
+        self.kept += 1
+        return slot
+
+
+class SogramLines(object):
+    """
+    DPXogram lines as raw int16 values plus the dataSF scale factor of
+    each line. Indexing returns lines scaled to dBm, computed only for the
+    lines asked for; raw and scale are the stored data.
+    """
+    def __init__(self, raw, scale):
+        self.raw = raw
+        self.scale = scale
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        #scaled line(s), e.g. lines[i] or lines[10:20]
+        scale = self.scale[index]
+        if np.ndim(scale) > 0:
+            scale = scale[:, np.newaxis]
+        return self.raw[index]*scale
+
+    def scaled(self, out=None, dtype=np.float32):
+        #every line scaled to dBm, into out if given
+        if out is None:
+            out = np.empty(self.raw.shape, dtype=dtype)
+        np.multiply(self.raw, self.scale[:, np.newaxis], out=out)
+        return out
+
+    def min(self):
+        #smallest scaled value, from the per-line raw extremes
+        return np.amin(np.where(self.scale >= 0, self.raw.min(axis=1),
+            self.raw.max(axis=1))*self.scale)
+
+    def max(self):
+        return np.amax(np.where(self.scale >= 0, self.raw.max(axis=1),
+            self.raw.min(axis=1))*self.scale)
+
+
+def get_sogram_lines(rsa, numLines, tracePoints, firstLine=0, out=None):
+    """
+    Fetches numLines DPXogram lines starting at firstLine with
+    DPX_GetSogramHiResLine(), each one written by the API straight into
+    its row of an int16 matrix (out if given, reused between calls).
+    Every call is checked; a failing line raises RuntimeError, and an out
+    that isn't a C-contiguous int16 array of at least (numLines,
+    tracePoints) raises ValueError before anything is fetched.
+    Returns a SogramLines.
+    """
+    if out is None:
+        out = np.empty((numLines, tracePoints), dtype=np.int16)
+    #the API writes through raw row pointers, so out must fit exactly
+    if out.dtype != np.int16 or not out.flags.c_contiguous:
+        raise ValueError('out must be a C-contiguous int16 array')
+    if out.ndim != 2 or out.shape[0] < numLines or out.shape[1] < tracePoints:
+        raise ValueError('out of shape {} is too small for {} lines of {} points'.format(
+            out.shape, numLines, tracePoints))
+    scale = np.empty(numLines, dtype=np.float64)
+
+    vDataSize = c_int32(0)
+    dataSF = c_double(0)
+    firstValidPoint = c_int32(0)
+    rowPtr = POINTER(c_int16)
+    base = out.ctypes.data
+    rowBytes = out.strides[0]
+    for i in xrange(numLines):
+        vData = cast(c_void_p(base + i*rowBytes), rowPtr)
+        ret = rsa.DPX_GetSogramHiResLine(vData, byref(vDataSize),
+            c_int32(firstLine + i), byref(dataSF), c_int32(tracePoints),
+            firstValidPoint)
+        if ret != 0:
+            raise RuntimeError('Error in DPX_GetSogramHiResLine: {} (line {})'.format(
+                ret, firstLine + i))
+        scale[i] = dataSF.value
+    return SogramLines(out[:numLines], scale)
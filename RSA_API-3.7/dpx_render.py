@@ -0,0 +1,104 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: DPX Raster Rendering
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0, MatPlotLib 1.4.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+DPX bitmaps and spectrograms rendered as images. Values are mapped to
+RGBA through a colormap lookup table with NumPy into preallocated
+buffers, then either shown with one imshow() image that's updated in
+place, or written straight to PNG files with no display at all.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+import struct, zlib
+import matplotlib
+#colormaps without pyplot, so rendering to PNG needs no GUI backend
+try:
+    _get_cmap = matplotlib.colormaps.__getitem__
+except AttributeError:
+    from matplotlib.cm import get_cmap as _get_cmap
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+class ColorMapper(object):
+    """
+    Maps 2-D arrays of shape to RGBA uint8 images with a levels entry
+    lookup table made from a Matplotlib colormap. Values from vmin to vmax
+    span the colormap, anything outside is clipped. With log=True the
+    mapping is done on log10(1 + value), which suits DPX hit counts.
+    render() reuses the same output array every call.
+    """
+    def __init__(self, shape, vmin, vmax, cmap='jet', levels=256, log=False):
+        self.lut = _get_cmap(cmap)(np.linspace(0, 1, levels), bytes=True)
+        self.log = log
+        self.set_limits(vmin, vmax)
+        self._scaled = np.empty(shape, dtype=np.float32)
+        self._index = np.empty(shape, dtype=np.intp)
+        self.rgba = np.empty(tuple(shape) + (4,), dtype=np.uint8)
+
+    def set_limits(self, vmin, vmax):
+        if self.log:
+            vmin, vmax = np.log10(1.0 + vmin), np.log10(1.0 + vmax)
+        span = float(vmax - vmin)
+        if span == 0:
+            #flat data, e.g. an empty DPXogram: all of it maps to the bottom
+            span = 1.0
+        self._offset = vmin
+        self._gain = (len(self.lut) - 1)/span
+
+    def render(self, data):
+        scaled = self._scaled
+        if self.log:
+            np.log10(np.add(data, 1.0, out=scaled), out=scaled)
+        else:
+            scaled[...] = data
+        scaled -= self._offset
+        scaled *= self._gain
+        np.clip(scaled, 0, len(self.lut) - 1, out=scaled)
+        self._index[...] = scaled
+        return self.lut.take(self._index, axis=0, out=self.rgba)
+
+
+class LiveImage(object):
+    """
+    imshow() image on ax that's redrawn in place with update(data).
+    extent is (left, right, bottom, top) in data coordinates; row 0 of
+    the data is drawn at the top.
+    """
+    def __init__(self, ax, mapper, extent):
+        self.mapper = mapper
+        self.image = ax.imshow(mapper.rgba, extent=extent, aspect='auto',
+            interpolation='nearest', origin='upper')
+
+    def update(self, data):
+        self.image.set_data(self.mapper.render(data))
+        return self.image
+
+
+def write_png(filename, rgba):
+    """
+    Writes an RGBA uint8 image of shape (height, width, 4) to a PNG file.
+    Only NumPy and zlib are used, so it runs without a display or PIL.
+    """
+    height, width = rgba.shape[:2]
+    #every row starts with filter type 0 (none)
+    rows = np.zeros((height, 1 + 4*width), dtype=np.uint8)
+    rows[:, 1:] = rgba.reshape(height, 4*width)
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    with open(filename, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6,
+            0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), 1)))
+        f.write(chunk(b'IEND', b''))
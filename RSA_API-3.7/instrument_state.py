@@ -0,0 +1,187 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Shadowed Instrument State
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Client-side copy of the instrument configuration. Setting a value that
+the instrument already has doesn't go over USB at all, and every change
+made between two apply() calls is sent in one stop/set/run cycle, which
+is what retune-heavy loops (sweeps, channel scans) spend most time on.
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected.
+"""
+
+from ctypes import *
+from collections import OrderedDict
+from spectrum_acquisition import Spectrum_Settings
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#shadowed parameters: (name, setter, getter, ctypes type)
+#changes are applied in this order
+PARAMETERS = [
+    ('referenceLevel', 'CONFIG_SetReferenceLevel', 'CONFIG_GetReferenceLevel', c_double),
+    ('centerFreq', 'CONFIG_SetCenterFreq', 'CONFIG_GetCenterFreq', c_double),
+    ('iqBandwidth', 'IQBLK_SetIQBandwidth', 'IQBLK_GetIQBandwidth', c_double),
+    ('iqRecordLength', 'IQBLK_SetIQRecordLength', 'IQBLK_GetIQRecordLength', c_int),
+    ('triggerMode', 'TRIG_SetTriggerMode', 'TRIG_GetTriggerMode', c_int),
+    ('triggerSource', 'TRIG_SetTriggerSource', 'TRIG_GetTriggerSource', c_int),
+    ('triggerLevel', 'TRIG_SetIFPowerTriggerLevel', 'TRIG_GetIFPowerTriggerLevel', c_double),
+    ('triggerPosition', 'TRIG_SetTriggerPositionPercent', 'TRIG_GetTriggerPositionPercent', c_double)]
+
+#Spectrum_Settings fields that SPECTRUM_SetSettings() takes, the rest are
+#the actual values the instrument reports back
+SPECTRUM_FIELDS = ('span', 'rbw', 'enableVBW', 'vbw', 'traceLength',
+    'window', 'verticalUnit')
+
+
+class InstrumentState(object):
+    """
+    Shadow of the configuration of the instrument behind rsa.
+
+    set() and set_spectrum() only queue values that differ from what the
+    instrument is known to have; apply() sends the queued changes, wrapped
+    in DEVICE_Stop()/DEVICE_Run() if the instrument was running. Values
+    that were never set or read are fetched with their getter the first
+    time they're needed, so everything the script does to the instrument
+    has to go through this object once it's in use.
+    """
+    def __init__(self, rsa):
+        self.rsa = rsa
+        self.running = False
+        self.specSet = None
+        self._specStale = False
+        #calls avoided and made, for tuning
+        self.skipped = 0
+        self.applied = 0
+        self._params = dict((p[0], p[1:]) for p in PARAMETERS)
+        self._values = {}
+        self._pending = OrderedDict()
+        self._pendingSpectrum = {}
+
+    def preset(self):
+        #CONFIG_Preset() and forget everything known about the instrument
+        self.stop()
+        self._check('CONFIG_Preset', self.rsa.CONFIG_Preset())
+        self._values.clear()
+        self._pending.clear()
+        self._pendingSpectrum.clear()
+        self._specStale = True
+
+    def get(self, name):
+        #value after the next apply()
+        if name in self._pending:
+            return self._pending[name]
+        if name not in self._values:
+            setter, getter, ctype = self._params[name]
+            value = ctype()
+            self._check(getter, getattr(self.rsa, getter)(byref(value)))
+            self._values[name] = value.value
+        return self._values[name]
+
+    def set(self, **values):
+        """
+        Queues parameter changes, e.g. set(centerFreq=1e9, referenceLevel=0).
+        Values equal to the instrument's are dropped.
+        """
+        for name, value in values.items():
+            if name not in self._params:
+                raise ValueError('Unknown parameter: {}'.format(name))
+            self._pending.pop(name, None)
+            if self.get(name) == value:
+                self.skipped += 1
+            else:
+                self._pending[name] = value
+
+    def enable_spectrum(self):
+        #SPECTRUM_SetEnable() with the SPECTRUM_SetDefault() settings
+        self._check('SPECTRUM_SetEnable', self.rsa.SPECTRUM_SetEnable(c_bool(True)))
+        self._check('SPECTRUM_SetDefault', self.rsa.SPECTRUM_SetDefault())
+        self._pendingSpectrum.clear()
+        self._specStale = True
+
+    def spectrum_settings(self):
+        """
+        The instrument's Spectrum_Settings. It's read once and again only
+        after something that changes the actual frequencies was applied,
+        always into the same structure.
+        """
+        if self.specSet is None or self._specStale:
+            if self.specSet is None:
+                self.specSet = Spectrum_Settings()
+            self._specStale = False
+            self._check('SPECTRUM_GetSettings',
+                self.rsa.SPECTRUM_GetSettings(byref(self.specSet)))
+        return self.specSet
+
+    def set_spectrum(self, **fields):
+        #queues Spectrum_Settings changes, e.g. set_spectrum(span=40e6)
+        specSet = self.spectrum_settings()
+        for field, value in fields.items():
+            if field not in SPECTRUM_FIELDS:
+                raise ValueError('Unknown spectrum setting: {}'.format(field))
+            self._pendingSpectrum.pop(field, None)
+            if getattr(specSet, field) == value:
+                self.skipped += 1
+            else:
+                self._pendingSpectrum[field] = value
+
+    def pending(self):
+        return len(self._pending) + len(self._pendingSpectrum) > 0
+
+    def apply(self):
+        """
+        Sends every queued change in one stop/set/run cycle. Returns False
+        without touching the instrument if nothing changed.
+        """
+        if not self.pending():
+            return False
+        wasRunning = self.running
+        self.stop()
+        for name, value in self._pending.items():
+            setter, getter, ctype = self._params[name]
+            value = ctype(value)
+            self._check(setter, getattr(self.rsa, setter)(value))
+            #read back what the instrument actually uses, it may clamp
+            self._check(getter, getattr(self.rsa, getter)(byref(value)))
+            self._values[name] = value.value
+            self.applied += 1
+            if name == 'centerFreq':
+                self._specStale = True
+        self._pending.clear()
+
+        if self._pendingSpectrum:
+            specSet = self.spectrum_settings()
+            for field, value in self._pendingSpectrum.items():
+                setattr(specSet, field, value)
+            self._check('SPECTRUM_SetSettings',
+                self.rsa.SPECTRUM_SetSettings(specSet))
+            #read back the actual frequencies and bandwidths
+            self._check('SPECTRUM_GetSettings',
+                self.rsa.SPECTRUM_GetSettings(byref(specSet)))
+            self._pendingSpectrum.clear()
+            self.applied += 1
+
+        if wasRunning:
+            self.run()
+        return True
+
+    def run(self):
+        if not self.running:
+            self._check('DEVICE_Run', self.rsa.DEVICE_Run())
+            self.running = True
+
+    def stop(self):
+        if self.running:
+            self._check('DEVICE_Stop', self.rsa.DEVICE_Stop())
+            self.running = False
+
+    def _check(self, function, ret):
+        if ret != 0:
+            raise RuntimeError('Error in {}: {}'.format(function, ret))
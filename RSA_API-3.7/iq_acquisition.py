@@ -0,0 +1,172 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Continuous Block IQ Acquisition
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Back-to-back block IQ acquisition into a fixed set of preallocated
+buffers. A worker thread fills one buffer with IQBLK_AcquireIQData()/
+IQBLK_GetIQDataDeinterleaved() while the caller processes the previous
+one, so no memory is allocated per record. Records can also be fetched
+interleaved with IQBLK_GetIQData() straight into complex64 arrays.
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected.
+"""
+
+from ctypes import *
+import numpy as np
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+def aligned_empty(shape, dtype, alignment=64):
+    #np.empty() with the first element on an alignment-byte boundary
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape))*dtype.itemsize
+    raw = np.empty(nbytes + alignment, dtype=np.uint8)
+    offset = -raw.ctypes.data % alignment
+    return raw[offset:offset+nbytes].view(dtype).reshape(shape)
+
+
+def get_iq_data_complex(rsa, iqData):
+    """
+    Fetches the acquired record with IQBLK_GetIQData() directly into
+    iqData, a complex64 array of the record length. The interleaved
+    I,Q,I,Q... floats the API writes are exactly the memory layout of
+    complex64, so no copy or deinterleave is needed.
+    Returns the number of IQ pairs written and the API return code.
+    """
+    actLength = c_int(0)
+    ret = rsa.IQBLK_GetIQData(iqData.ctypes.data_as(POINTER(c_float)), 
+        byref(actLength), c_int(len(iqData)))
+    return actLength.value, ret
+
+
+def complex_empty(length):
+    #aligned complex64 array suitable for get_iq_data_complex()
+    return aligned_empty((length,), np.complex64)
+
+
+class BlockIQAcquisition(object):
+    """
+    Continuous block IQ acquisition with N reusable buffers.
+
+    IQBLK_SetIQRecordLength() and the rest of the IQ configuration must
+    already be set and DEVICE_Run() sent before start(). Each call to
+    next_record() hands back the oldest filled buffer as zero-copy float32
+    NumPy views and returns the buffer handed out by the previous call to
+    the worker, so a record is valid until the next call to next_record().
+    With numBuffers=2 this is classic double buffering; more buffers let
+    the worker run further ahead of a slow consumer.
+
+    With interleaved=True records are fetched with IQBLK_GetIQData() and
+    next_record() returns a single complex64 view instead of (I, Q).
+    """
+    def __init__(self, rsa, recordLength, numBuffers=2, timeoutMsec=100, 
+        interleaved=False):
+        self.rsa = rsa
+        self.recordLength = recordLength
+        self.numBuffers = numBuffers
+        self.timeoutMsec = timeoutMsec
+        self.interleaved = interleaved
+
+        #pad each row so every I, Q or IQ array starts on a 64 byte boundary
+        if interleaved:
+            rowLength = -(-recordLength//8)*8
+            self.buffers = aligned_empty((numBuffers, rowLength), np.complex64)
+        else:
+            rowLength = -(-recordLength//16)*16
+            self.buffers = aligned_empty((numBuffers, 2, rowLength), np.float32)
+        self.records = 0
+
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        self._current = None
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        for i in xrange(self.numBuffers):
+            self._free.put(i)
+        self._running.set()
+        self._thread = threading.Thread(target=self._acquire_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        #throw away anything left over so start() begins from scratch
+        for q in (self._free, self._filled):
+            while not q.empty():
+                q.get_nowait()
+        self._current = None
+
+    def next_record(self, timeout=None):
+        """
+        Returns (I, Q) for the next acquired record, or the complex IQ
+        record when interleaved.
+        Raises queue.Empty if nothing arrives within timeout seconds.
+        """
+        if self._current is not None:
+            self._free.put(self._current)
+            self._current = None
+        index, actLength, error = self._filled.get(timeout=timeout)
+        if error is not None:
+            raise RuntimeError(error)
+        self._current = index
+        self.records += 1
+        if self.interleaved:
+            return self.buffers[index, :actLength]
+        return self.buffers[index, 0, :actLength], self.buffers[index, 1, :actLength]
+
+    def __iter__(self):
+        while True:
+            yield self.next_record()
+
+    def _acquire_loop(self):
+        ready = c_bool(False)
+        actLength = c_int(0)
+        recordLength = c_int(self.recordLength)
+        timeoutMsec = c_int(self.timeoutMsec)
+
+        while self._running.is_set():
+            try:
+                index = self._free.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            self.rsa.IQBLK_AcquireIQData()
+            ready.value = False
+            while ready.value == False and self._running.is_set():
+                self.rsa.IQBLK_WaitForIQDataReady(timeoutMsec, byref(ready))
+            if ready.value == False:
+                break
+
+            if self.interleaved:
+                length, ret = get_iq_data_complex(self.rsa, 
+                    self.buffers[index, :self.recordLength])
+                function = 'IQBLK_GetIQData'
+            else:
+                iData = self.buffers[index, 0].ctypes.data_as(POINTER(c_float))
+                qData = self.buffers[index, 1].ctypes.data_as(POINTER(c_float))
+                ret = self.rsa.IQBLK_GetIQDataDeinterleaved(iData, qData,
+                    byref(actLength), recordLength)
+                length = actLength.value
+                function = 'IQBLK_GetIQDataDeinterleaved'
+            if ret != 0:
+                self._filled.put((index, 0, 
+                    'Error in {}: {}'.format(function, ret)))
+                break
+            self._filled.put((index, length, None))
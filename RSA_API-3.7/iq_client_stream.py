@@ -0,0 +1,261 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Client IQ Streaming
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+IQ streaming to the client (IQSTREAM destination 0) instead of to disk.
+A producer thread pulls blocks with IQSTREAM_GetIQData() straight into a
+large preallocated ring buffer; readers wait for contiguous windows of
+samples, each with its own position, and count what they lose if they
+fall more than the buffer behind. The producer publishes the sample count
+without taking a lock; the condition variable is only used to wake
+readers that are waiting for data. AsyncReader wraps a reader for asyncio
+consumers.
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected.
+"""
+
+from ctypes import *
+import numpy as np
+import threading, time
+from stream_status import StatusCounters
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+class IQSTRMIQINFO(Structure):
+    _fields_ = [('timestamp', c_uint64),
+    ('triggerCount', c_int),
+    ('triggerIndices', POINTER(c_int)),
+    ('scaleFactor', c_double),
+    ('acqStatus', c_uint32)]
+
+#IQSTREAM_SetOutputConfiguration() data types: 0 = single, 1 = int32, 2 = int16
+STREAM_DTYPES = {0: np.float32, 1: np.int32, 2: np.int16}
+
+
+class ClientStream(object):
+    """
+    IQ stream of bandwidth Hz into a ring buffer of capacity IQ pairs.
+
+    Samples are stored interleaved as they come from the API, as rows of
+    (I, Q) of the stream data type (dtype 0 = float32, 1 = int32, 2 =
+    int16, see scaleFactor for the int types). The first maxWindow pairs
+    are mirrored past the end of the buffer so any window of up to
+    maxWindow pairs can be handed out as one contiguous view.
+
+    The instrument can't be paused, so the producer never waits: when a
+    reader is more than capacity samples behind, the oldest samples are
+    overwritten and the reader skips ahead, counting them as lost.
+    start() sends DEVICE_Run() and IQSTREAM_Start().
+    """
+    def __init__(self, rsa, bandwidth=40e6, dtype=2, capacity=2**24,
+        maxWindow=2**16):
+        self.rsa = rsa
+        self.bandwidth = bandwidth
+        self.dtype = dtype
+        self.capacity = capacity
+        self.maxWindow = maxWindow
+        self.sampleRate = None
+        self.blockSize = None
+        self.data = None
+
+        #written by the producer thread only
+        self.written = 0        #total IQ pairs received
+        self.blocks = 0
+        self.acqStatus = 0      #acqStatus of every block ORed together
+        self.counters = StatusCounters()
+        self.scaleFactor = 1.0
+        self.sample0Timestamp = None
+        self.error = None
+
+        self._dataReady = threading.Condition()
+        self._running = threading.Event()
+        self._thread = None
+
+    def configure(self):
+        rsa = self.rsa
+        bwHz_act = c_double(0)
+        sRate = c_double(0)
+        blockSize = c_int(0)
+        self._check('IQSTREAM_SetAcqBandwidth',
+            rsa.IQSTREAM_SetAcqBandwidth(c_double(self.bandwidth)))
+        rsa.IQSTREAM_GetAcqParameters(byref(bwHz_act), byref(sRate))
+        self._check('IQSTREAM_SetOutputConfiguration',
+            rsa.IQSTREAM_SetOutputConfiguration(c_int(0), c_int(self.dtype)))
+        self._check('IQSTREAM_GetIQDataBufferSize',
+            rsa.IQSTREAM_GetIQDataBufferSize(byref(blockSize)))
+        self.bandwidth = bwHz_act.value
+        self.sampleRate = sRate.value
+        self.blockSize = blockSize.value
+
+        #every block is written in place, so the mirror must hold a block
+        self.maxWindow = max(self.maxWindow, self.blockSize)
+        self.data = np.zeros((self.capacity + self.maxWindow, 2),
+            dtype=STREAM_DTYPES[self.dtype])
+
+    def start(self):
+        if self.data is None:
+            self.configure()
+        self.written = 0
+        self.blocks = 0
+        self.acqStatus = 0
+        self.counters.clear()
+        self.error = None
+        self.sample0Timestamp = None
+        self._running.set()
+        self._thread = threading.Thread(target=self._stream_loop)
+        self._thread.daemon = True
+        self.rsa.DEVICE_Run()
+        self._check('IQSTREAM_Start', self.rsa.IQSTREAM_Start())
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.rsa.IQSTREAM_Stop()
+        with self._dataReady:
+            self._dataReady.notify_all()
+
+    def reader(self):
+        #new reader starting at the newest sample
+        return StreamReader(self, self.written)
+
+    def _stream_loop(self):
+        iqLen = c_int(0)
+        iqInfo = IQSTRMIQINFO()
+        rowBytes = self.data.strides[0]
+        base = self.data.ctypes.data
+        try:
+            while self._running.is_set():
+                pos = self.written % self.capacity
+                ret = self.rsa.IQSTREAM_GetIQData(c_void_p(base + pos*rowBytes),
+                    byref(iqLen), byref(iqInfo))
+                self._check('IQSTREAM_GetIQData', ret)
+                n = iqLen.value
+                if n == 0:
+                    #nothing ready yet, don't spin on the USB driver
+                    time.sleep(0.0005)
+                    continue
+                self._commit(pos, n)
+                if self.sample0Timestamp is None:
+                    self.sample0Timestamp = iqInfo.timestamp
+                self.scaleFactor = iqInfo.scaleFactor
+                self.acqStatus |= iqInfo.acqStatus
+                self.counters.update(iqInfo.acqStatus)
+                self.blocks += 1
+                #written only ever grows and has a single writer, so it's
+                #published as is; the lock is only taken for the wakeup,
+                #which a reader can't miss since it checks written under it
+                self.written += n
+                with self._dataReady:
+                    self._dataReady.notify_all()
+        except RuntimeError as e:
+            self.error = str(e)
+            self._running.clear()
+            with self._dataReady:
+                self._dataReady.notify_all()
+
+    def _commit(self, pos, n):
+        #a block that ran past the end belongs at the start of the buffer,
+        #and whatever landed in the first maxWindow rows is mirrored
+        data = self.data
+        end = pos + n
+        if end > self.capacity:
+            data[:end - self.capacity] = data[self.capacity:end]
+        if pos < self.maxWindow:
+            stop = min(end, self.maxWindow)
+            data[self.capacity + pos:self.capacity + stop] = data[pos:stop]
+
+    def _check(self, function, ret):
+        if ret != 0:
+            raise RuntimeError('Error in {}: {}'.format(function, ret))
+
+
+class StreamReader(object):
+    """
+    Independent read position in a ClientStream. read() hands out windows
+    in order, with no gaps unless the reader fell behind, in which case it
+    jumps to the oldest sample still in the buffer and adds the skipped
+    samples to lost.
+    """
+    def __init__(self, stream, position):
+        self.stream = stream
+        self.position = position
+        self.lost = 0
+
+    def available(self):
+        return self.stream.written - self.position
+
+    def read(self, n, timeout=None):
+        """
+        Waits for the next n IQ pairs (n <= maxWindow) and returns
+        (iq, sampleIndex): iq is an (n, 2) view of the ring buffer, valid
+        until the producer wraps around to it, and sampleIndex the index
+        of its first sample since the stream started. Returns (None, None)
+        on timeout or when the stream stopped.
+        """
+        stream = self.stream
+        if n > stream.maxWindow:
+            raise ValueError('Window of {} samples is larger than maxWindow {}'.format(
+                n, stream.maxWindow))
+        deadline = None if timeout is None else time.time() + timeout
+        with stream._dataReady:
+            while stream.written - self.position < n:
+                if not stream._running.is_set():
+                    if stream.error is not None:
+                        raise RuntimeError(stream.error)
+                    return None, None
+                wait = None if deadline is None else deadline - time.time()
+                if wait is not None and wait <= 0:
+                    return None, None
+                stream._dataReady.wait(0.1 if wait is None else min(wait, 0.1))
+            written = stream.written
+
+        #overflow: the oldest unread samples were already overwritten
+        oldest = written - stream.capacity + stream.blockSize
+        if self.position < oldest:
+            self.lost += oldest - self.position
+            self.position = oldest
+
+        start = self.position % stream.capacity
+        self.position += n
+        return stream.data[start:start + n], self.position - n
+
+
+class AsyncReader(object):
+    """
+    asyncio front end to a StreamReader. read() returns a future for the
+    next window, run on an executor thread so the event loop never waits
+    on the stream:
+        iq, index = await asyncReader.read(4096)
+    The future belongs to loop if given, otherwise to the loop running
+    when read() is called.
+    """
+    def __init__(self, reader, loop=None, executor=None):
+        if asyncio is None:
+            raise RuntimeError('asyncio is not available')
+        self.reader = reader
+        self.loop = loop
+        self.executor = executor
+
+    def read(self, n, timeout=None):
+        loop = self.loop
+        if loop is None:
+            if hasattr(asyncio, 'get_running_loop'):
+                loop = asyncio.get_running_loop()
+            else:
+                loop = asyncio.get_event_loop()
+        return loop.run_in_executor(self.executor, self.reader.read,
+            n, timeout)
@@ -0,0 +1,140 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Client IQ Streaming
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+"""
+
+from ctypes import *
+import numpy as np
+import os, time
+from iq_client_stream import ClientStream
+
+"""
+################################################################
+C:\Tektronix\RSA_API\lib\x64 needs to be added to the 
+PATH system environment variable
+################################################################
+"""
+os.chdir("C:\\Tektronix\\RSA_API\\lib\\x64")
+rsa = cdll.LoadLibrary("RSA_API.dll")
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+def search_connect():
+    #search/connect variables
+    numFound = c_int(0)
+    intArray = c_int*10
+    deviceIDs = intArray()
+    #this is absolutely asinine, but it works
+    deviceSerial = c_char_p('longer than the longest serial number')
+    deviceType = c_char_p('longer than the longest device type')
+    apiVersion = c_char_p('api')
+
+    #get API version
+    rsa.DEVICE_GetAPIVersion(apiVersion)
+    print('API Version {}'.format(apiVersion.value))
+
+    #search
+    ret = rsa.DEVICE_Search(byref(numFound), deviceIDs, 
+        deviceSerial, deviceType)
+
+    if ret != 0:
+        print('Error in Search: ' + str(ret))
+        exit()
+    if numFound.value < 1:
+        print('No instruments found. Exiting script.')
+        exit()
+    elif numFound.value == 1:
+        print('One device found.')
+        print('Device type: {}'.format(deviceType.value))
+        print('Device serial number: {}'.format(deviceSerial.value))
+        ret = rsa.DEVICE_Connect(deviceIDs[0])
+        if ret != 0:
+            print('Error in Connect: ' + str(ret))
+            exit()
+    else:
+        print('2 or more instruments found. Enumerating instruments, please wait.')
+        for inst in xrange(numFound.value):
+            rsa.DEVICE_Connect(deviceIDs[inst])
+            rsa.DEVICE_GetSerialNumber(deviceSerial)
+            rsa.DEVICE_GetNomenclature(deviceType)
+            print('Device {}'.format(inst))
+            print('Device Type: {}'.format(deviceType.value))
+            print('Device serial number: {}'.format(deviceSerial.value))
+            rsa.DEVICE_Disconnect()
+        #note: the API can only currently access one at a time
+        selection = 1024
+        while (selection > numFound.value-1) or (selection < 0):
+            selection = int(input('Select device between 0 and {}\n> '.format(numFound.value-1)))
+        rsa.DEVICE_Connect(deviceIDs[selection])
+        return selection
+
+
+def main():
+    """#################INITIALIZE VARIABLES#################"""
+    #main SA parameters
+    cf = c_double(1e9)          #center freq
+    refLevel = c_double(0)      #ref level
+    bandwidth = 40e6            #IQ streaming bandwidth
+    dtype = 2                   #0 = single, 1 = int32, 2 = int16
+    window = 2**16              #IQ pairs per processed window
+    acqTime = 10                #seconds to stream
+
+
+    """#################SEARCH/CONNECT#################"""
+    search_connect()
+
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    rsa.CONFIG_Preset()
+    rsa.CONFIG_SetCenterFreq(cf)
+    rsa.CONFIG_SetReferenceLevel(refLevel)
+
+    #stream to the client (dest 0) into a 2**24 IQ pair ring buffer
+    stream = ClientStream(rsa, bandwidth, dtype, capacity=2**24, 
+        maxWindow=window)
+    stream.configure()
+    print('IQ bandwidth: {} MHz, sample rate: {} MS/s, {} IQ pairs per block.'.format(
+        stream.bandwidth/1e6, stream.sampleRate/1e6, stream.blockSize))
+
+
+    """#################ACQUIRE/PROCESS DATA#################"""
+    #samples are processed straight from the ring buffer, nothing is
+    #written to disk
+    reader = stream.reader()
+    stream.start()
+    start = time.time()
+    windows = 0
+    maxPower = -np.inf
+    while time.time() - start < acqTime:
+        iq, sampleIndex = reader.read(window, timeout=1)
+        if iq is None:
+            break
+        #average power in dBm into 50 ohms
+        iq = iq*stream.scaleFactor
+        power = 10*np.log10(np.mean(iq[:, 0]**2 + iq[:, 1]**2)/(2*50*1e-3))
+        maxPower = max(maxPower, power)
+        windows += 1
+    elapsed = time.time() - start
+    stream.stop()
+    rsa.DEVICE_Stop()
+
+    print('{} IQ pairs streamed in {} seconds: {} MS/s.'.format(
+        stream.written, elapsed, stream.written/elapsed/1e6))
+    print('{} windows processed, {} IQ pairs lost by the reader.'.format(
+        windows, reader.lost))
+    print('Max average power per window: %3.2f dBm' % maxPower)
+    print('acqStatus: 0x%x' % stream.acqStatus)
+    print(stream.counters)
+
+    print('Disconnecting.')
+    rsa.DEVICE_Disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Client IQ Streaming with asyncio
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 3.5+ 64-bit (asyncio, async/await)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Same acquisition as iq_client_streaming.py, with the windows consumed by
+an asyncio coroutine through AsyncReader while a second coroutine reports
+progress every second, showing that waiting for IQ data doesn't block
+the event loop.
+"""
+
+from ctypes import *
+import numpy as np
+import asyncio, os, time
+from iq_client_stream import ClientStream, AsyncReader
+
+r"""
+################################################################
+C:\Tektronix\RSA_API\lib\x64 needs to be added to the 
+PATH system environment variable
+################################################################
+"""
+os.chdir("C:\\Tektronix\\RSA_API\\lib\\x64")
+rsa = cdll.LoadLibrary("RSA_API.dll")
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+def search_connect():
+    #search/connect variables
+    numFound = c_int(0)
+    intArray = c_int*10
+    deviceIDs = intArray()
+    #ctypes needs bytes for char* in Python 3
+    deviceSerial = create_string_buffer(64)
+    deviceType = create_string_buffer(64)
+    apiVersion = create_string_buffer(64)
+
+    #get API version
+    rsa.DEVICE_GetAPIVersion(apiVersion)
+    print('API Version {}'.format(apiVersion.value.decode()))
+
+    #search
+    ret = rsa.DEVICE_Search(byref(numFound), deviceIDs, 
+        deviceSerial, deviceType)
+
+    if ret != 0:
+        print('Error in Search: ' + str(ret))
+        exit()
+    if numFound.value < 1:
+        print('No instruments found. Exiting script.')
+        exit()
+    elif numFound.value == 1:
+        print('One device found.')
+        print('Device type: {}'.format(deviceType.value.decode()))
+        print('Device serial number: {}'.format(deviceSerial.value.decode()))
+        ret = rsa.DEVICE_Connect(deviceIDs[0])
+        if ret != 0:
+            print('Error in Connect: ' + str(ret))
+            exit()
+    else:
+        print('2 or more instruments found. Enumerating instruments, please wait.')
+        for inst in range(numFound.value):
+            rsa.DEVICE_Connect(deviceIDs[inst])
+            rsa.DEVICE_GetSerialNumber(deviceSerial)
+            rsa.DEVICE_GetNomenclature(deviceType)
+            print('Device {}'.format(inst))
+            print('Device Type: {}'.format(deviceType.value.decode()))
+            print('Device serial number: {}'.format(deviceSerial.value.decode()))
+            rsa.DEVICE_Disconnect()
+        #note: the API can only currently access one at a time
+        selection = 1024
+        while (selection > numFound.value-1) or (selection < 0):
+            selection = int(input('Select device between 0 and {}\n> '.format(numFound.value-1)))
+        rsa.DEVICE_Connect(deviceIDs[selection])
+        return selection
+
+
+async def consume(asyncReader, stream, window, acqTime, results):
+    #average power of every window, awaiting each one from the ring buffer
+    start = time.time()
+    while time.time() - start < acqTime:
+        iq, sampleIndex = await asyncReader.read(window, timeout=1)
+        if iq is None:
+            break
+        iq = iq*stream.scaleFactor
+        power = 10*np.log10(np.mean(iq[:, 0]**2 + iq[:, 1]**2)/(2*50*1e-3))
+        results['maxPower'] = max(results['maxPower'], power)
+        results['windows'] += 1
+
+
+async def report(stream, results, done):
+    #runs alongside consume() on the same event loop
+    while not done.is_set():
+        print('{} IQ pairs received, {} windows processed.'.format(
+            stream.written, results['windows']))
+        try:
+            await asyncio.wait_for(done.wait(), 1)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def stream_and_process(stream, window, acqTime):
+    asyncReader = AsyncReader(stream.reader())
+    results = {'windows': 0, 'maxPower': -np.inf}
+    done = asyncio.Event()
+    reporter = asyncio.ensure_future(report(stream, results, done))
+    stream.start()
+    start = time.time()
+    try:
+        await consume(asyncReader, stream, window, acqTime, results)
+    finally:
+        elapsed = time.time() - start
+        stream.stop()
+        done.set()
+        await reporter
+    return results, asyncReader.reader.lost, elapsed
+
+
+def main():
+    """#################INITIALIZE VARIABLES#################"""
+    #main SA parameters
+    cf = c_double(1e9)          #center freq
+    refLevel = c_double(0)      #ref level
+    bandwidth = 40e6            #IQ streaming bandwidth
+    dtype = 2                   #0 = single, 1 = int32, 2 = int16
+    window = 2**16              #IQ pairs per processed window
+    acqTime = 10                #seconds to stream
+
+
+    """#################SEARCH/CONNECT#################"""
+    search_connect()
+
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    rsa.CONFIG_Preset()
+    rsa.CONFIG_SetCenterFreq(cf)
+    rsa.CONFIG_SetReferenceLevel(refLevel)
+
+    stream = ClientStream(rsa, bandwidth, dtype, capacity=2**24, 
+        maxWindow=window)
+    stream.configure()
+    print('IQ bandwidth: {} MHz, sample rate: {} MS/s, {} IQ pairs per block.'.format(
+        stream.bandwidth/1e6, stream.sampleRate/1e6, stream.blockSize))
+
+
+    """#################ACQUIRE/PROCESS DATA#################"""
+    if hasattr(asyncio, 'run'):
+        results, lost, elapsed = asyncio.run(
+            stream_and_process(stream, window, acqTime))
+    else:
+        loop = asyncio.get_event_loop()
+        results, lost, elapsed = loop.run_until_complete(
+            stream_and_process(stream, window, acqTime))
+    rsa.DEVICE_Stop()
+
+    print('{} IQ pairs streamed in {} seconds: {} MS/s.'.format(
+        stream.written, elapsed, stream.written/elapsed/1e6))
+    print('{} windows processed, {} IQ pairs lost by the reader.'.format(
+        results['windows'], lost))
+    print('Max average power per window: %3.2f dBm' % results['maxPower'])
+    print(stream.counters)
+
+    print('Disconnecting.')
+    rsa.DEVICE_Disconnect()
+
+if __name__ == "__main__":
+    main()
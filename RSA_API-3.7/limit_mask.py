@@ -0,0 +1,111 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Spectral Limit Masks
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Pass/fail limit mask testing of spectrum traces for compliance monitoring.
+A mask is projected onto the trace frequency grid once per spectrum
+settings and then every trace, or a whole batch of stored traces, is
+tested with one vectorized comparison.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+from ring_buffer import RingBuffer
+from settings_cache import SettingsCache, frequency_axis
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#one entry per failed trace in ViolationLog
+VIOLATION_DTYPE = np.dtype([('timestamp', np.float64),
+    ('margin', np.float32),
+    ('freq', np.float64)])
+
+
+class LimitMask(object):
+    """
+    Piecewise-linear limit line in dBm.
+
+    freqs and limits are the mask breakpoints, in Hz and dBm. With
+    relative=True freqs are offsets from the center frequency, so the mask
+    follows retunes. An upper mask fails when the trace goes above it, a
+    lower mask (upper=False) when it goes below. Trace points outside the
+    first/last breakpoint aren't tested. Repeat a frequency to make a step.
+    """
+    def __init__(self, freqs, limits, relative=False, upper=True):
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.limits = np.asarray(limits, dtype=np.float64)
+        self.relative = relative
+        self.upper = upper
+        #projections for the last few settings, for retunes back and forth
+        self._projections = SettingsCache(4)
+
+    def project(self, specSet):
+        """
+        Returns the mask as one limit per trace point for specSet, NaN
+        where it isn't tested. It's only recomputed for settings that
+        weren't used recently.
+        """
+        return self._projections.get('mask', specSet, 
+            lambda: self._project(specSet))
+
+    def _project(self, specSet):
+        freq = frequency_axis(specSet)
+        if self.relative:
+            cf = (specSet.actualStartFreq + specSet.actualStopFreq)/2.0
+            freq = freq - cf
+        return np.interp(freq, self.freqs, self.limits, 
+            left=np.nan, right=np.nan)
+
+    def margin(self, traces, specSet):
+        #dB between each trace point and the mask, negative where it fails
+        limit = self.project(specSet)
+        if self.upper:
+            return limit - traces
+        return traces - limit
+
+    def test(self, traces, specSet):
+        """
+        Tests one trace or a 2-D array of traces (one per row).
+        Returns (passed, worstMargin, worstIndex): whether each trace is
+        within the mask, its smallest margin in dB and the trace point
+        where that margin occurs.
+        """
+        margin = self.margin(np.asarray(traces), specSet)
+        tested = ~np.isnan(margin)
+        margin = np.where(tested, margin, np.inf)
+        worstIndex = np.argmin(margin, axis=-1)
+        worstMargin = np.amin(margin, axis=-1)
+        return worstMargin >= 0, worstMargin, worstIndex
+
+
+class ViolationLog(object):
+    """
+    Fixed-size log of the (timestamp, margin, freq) of every trace that
+    failed a mask test, newest last.
+    """
+    def __init__(self, capacity=10000):
+        self.records = RingBuffer(capacity, VIOLATION_DTYPE)
+        self.violations = 0
+
+    def log(self, timestamps, passed, worstMargin, worstIndex, freq):
+        #takes the results of LimitMask.test() for one or more traces
+        failed = ~np.atleast_1d(passed)
+        numFailed = np.count_nonzero(failed)
+        if numFailed:
+            rows = np.empty(numFailed, dtype=VIOLATION_DTYPE)
+            rows['timestamp'] = np.atleast_1d(timestamps)[failed]
+            rows['margin'] = np.atleast_1d(worstMargin)[failed]
+            rows['freq'] = freq[np.atleast_1d(worstIndex)[failed]]
+            self.records.extend(rows)
+            self.violations += numFailed
+        return numFailed
+
+    def latest(self, n=None):
+        return self.records.latest(n)
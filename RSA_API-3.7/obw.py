@@ -16,6 +16,10 @@ from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from spectrum_acquisition import iter_traces
+from spectrum_measurements import trace_to_mw, occupied_bandwidth
+from channel_power import ChannelPower, adjacent_channels
+from settings_cache import frequency_axis
 
 
 """
@@ -124,7 +128,6 @@ def main():
     trace = c_int(0)              #select Trace 1 
     detector = c_int(1)           #set detector type to max
 
-    traceInfo = Spectrum_TraceInfo()
     o_timeSec = c_uint64(0)
     o_timeNsec = c_uint64(0)
 
@@ -166,26 +169,18 @@ def main():
 
 
     """#################INITIALIZE DATA TRANSFER VARIABLES#################"""
-    #initialize variables for GetTrace
-    traceArray = c_float * specSet.traceLength
-    traceData = traceArray()
-    outTracePoints = c_int()
+    #traces are fetched by iter_traces(), which allocates its own array
 
     #generate frequency array for plotting the spectrum
-    freq = np.arange(specSet.actualStartFreq, 
-        specSet.actualStartFreq + specSet.actualFreqStepSize*specSet.traceLength, 
-        specSet.actualFreqStepSize)
+    freq = frequency_axis(specSet)
 
 
     """#################ACQUIRE/PROCESS DATA#################"""
     #start acquisition
     rsa.DEVICE_Run()
-    rsa.SPECTRUM_AcquireTrace()
-    while ready.value == False:
-        rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
-    rsa.SPECTRUM_GetTrace(c_int(0), specSet.traceLength, 
-        byref(traceData), byref(outTracePoints))
-    rsa.SPECTRUM_GetTraceInfo(byref(traceInfo))
+    traces = iter_traces(rsa, specSet.traceLength)
+    trace, traceInfo = next(traces)
+    traces.close()
     rsa.DEVICE_Stop()
 
     i_timestamp = c_uint64(traceInfo.timestamp)
@@ -194,9 +189,6 @@ def main():
     print('Seconds since 00:00:00 on Jan 1, 1970: {}'.format(
         o_timeSec.value))
 
-    #convert trace data from a ctypes array to a numpy array
-    trace = np.ctypeslib.as_array(traceData)
-
     #Peak power and frequency calculations
     peakPower = np.amax(trace)
     peakPowerFreq = freq[np.argmax(trace)]
@@ -206,9 +198,9 @@ def main():
     """#################OCCUPIED BANDWIDTH MEASUREMENT#################"""
     #integrated power calculation
     #convert dBm to mW and normalize to span
-    mW = 10**(trace/10)*specSet.span/specSet.actualRBW/specSet.traceLength
-    #numerical integration --> total power in mW
-    totPower = np.trapz(mW)
+    mW = trace_to_mw(trace, specSet)
+    #total power in mW
+    totPower = np.sum(mW)
     #convert total power to dBm
     totdBm = 10*np.log10(totPower)
     #print('Total Power in mW: %f' % totPower)
@@ -217,27 +209,29 @@ def main():
     #percent occupied bandwidth
     obwpcnt = 0.99
 
-    #Sum the power of each point together working in from both sides of the 
-    #trace until the sum is > 1-obwpcnt of total power. When the sum is reached, 
-    #save the frequencies at which it occurs.
-    psum = j = k = 0
-    while psum <= (1-obwpcnt)*totPower:
-   	psum = psum + mW[j] + mW[k]
-   	j += 1
-   	k -= 1
-    f1 = freq[j]
-    f2 = freq[k]
-
-    #occupied bandwidth is the difference between f1 and f2
-    obw = f2-f1
+    #f1 and f2 are the frequencies below and above which (1-obwpcnt)/2 of the
+    #total power lies, interpolated within the edge bins. trace can also be
+    #a 2-D array of traces to measure all of them at once.
+    f1, f2, obw = occupied_bandwidth(trace, freq, specSet, obwpcnt)
     print('OBW: %f MHz' % (obw/1e6))
-    #print('Power at f1: %3.2f dBm. Power at f2: %3.2f dBm' % (trace[j], trace[k]))
+
+
+    """#################CHANNEL POWER/ACPR MEASUREMENT#################"""
+    #5 MHz main channel with two adjacent channels on each side
+    #the bin weights are computed once, every channel of every trace is
+    #then measured with one matrix multiply
+    channels = ChannelPower(*adjacent_channels(5e6, 5e6, numAdjacent=2))
+    acpr, chPower = channels.acpr(trace, specSet, reference=2)
+    print('Channel power: %3.2f dBm' % chPower)
+    for offset, ratio in zip(channels.offsets, acpr):
+        if offset != 0:
+            print('ACPR @ %+d MHz: %3.2f dBc' % (offset/1e6, ratio))
 
 
     """#################SPECTRUM PLOT#################"""
     #plot the spectrum trace (optional)
     plt.subplot(111, axisbg='k')
-    plt.plot(freq, traceData, 'y')
+    plt.plot(freq, trace, 'y')
     plt.xlabel('Frequency (Hz)')
     plt.ylabel('Amplitude (dBm)')
     plt.title('Spectrum')
@@ -16,6 +16,10 @@ from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
 import os
+from spectrum_acquisition import iter_traces
+from limit_mask import LimitMask, ViolationLog
+from spectrum_measurements import find_peaks
+from settings_cache import frequency_axis
 
 """
 ################################################################
@@ -123,7 +127,6 @@ def main():
 	trace = c_int(0)              #select Trace 1 
 	detector = c_int(1)           #set detector type to max
 
-	traceInfo = Spectrum_TraceInfo()
 	o_timeSec = c_uint64(0)
 	o_timeNsec = c_uint64(0)
 
@@ -164,26 +167,18 @@ def main():
 
 
 	"""#################INITIALIZE DATA TRANSFER VARIABLES#################"""
-	#initialize variables for GetTrace
-	traceArray = c_float * specSet.traceLength
-	traceData = traceArray()
-	outTracePoints = c_int()
+	#traces are fetched by iter_traces(), which allocates its own array
 
 	#generate frequency array for plotting the spectrum
-	freq = np.arange(specSet.actualStartFreq, 
-		specSet.actualStartFreq + specSet.actualFreqStepSize*specSet.traceLength, 
-		specSet.actualFreqStepSize)
+	freq = frequency_axis(specSet)
 
 
 	"""#################ACQUIRE/PROCESS DATA#################"""
 	#start acquisition
 	rsa.DEVICE_Run()
-	rsa.SPECTRUM_AcquireTrace()
-	while ready.value == False:
-		rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
-	rsa.SPECTRUM_GetTrace(c_int(0), specSet.traceLength, 
-		byref(traceData), byref(outTracePoints))
-	rsa.SPECTRUM_GetTraceInfo(byref(traceInfo))
+	traces = iter_traces(rsa, specSet.traceLength)
+	trace, traceInfo = next(traces)
+	traces.close()
 	rsa.DEVICE_Stop()
 
 	i_timestamp = c_uint64(traceInfo.timestamp)
@@ -192,25 +187,46 @@ def main():
 	print('Seconds since 00:00:00 on Jan 1, 1970: {}'.format(
 	 	o_timeSec.value))
 
-	#convert trace data from a ctypes array to a numpy array
-	trace = np.ctypeslib.as_array(traceData)
-
 	#Peak power and frequency calculations
 	peakPower = np.amax(trace)
 	peakPowerFreq = freq[np.argmax(trace)]
 	print('Peak power in spectrum: %4.3f dBm @ %d Hz' % (peakPower, peakPowerFreq))
 
+	#table of the strongest peaks, at least 6 dB above their surroundings
+	peakTable = find_peaks(trace, freq, numPeaks=5, excursion=6, 
+		threshold=refLevel.value-80)
+	for i, peak in enumerate(peakTable):
+		print('Peak %d: %4.3f dBm @ %d Hz' % (i+1, peak.power, peak.freq))
+
+	#limit mask test, the mask follows the center frequency
+	#trace can also be a 2-D array of stored traces to test them all at once
+	mask = LimitMask([-20e6, -5e6, -5e6, 5e6, 5e6, 20e6],
+		[-60, -60, -20, -20, -60, -60], relative=True)
+	violations = ViolationLog()
+	passed, worstMargin, worstIndex = mask.test(trace, specSet)
+	violations.log(o_timeSec.value + o_timeNsec.value/1e9, passed, 
+		worstMargin, worstIndex, freq)
+	if passed:
+		print('Mask test passed, margin: %3.2f dB' % worstMargin)
+	else:
+		print('Mask test failed by %3.2f dB @ %d Hz' % (-worstMargin, 
+			freq[worstIndex]))
+
 
 	"""#################SPECTRUM PLOT#################"""
 	#plot the spectrum trace (optional)
 	plt.subplot(111, axisbg='k')
-	plt.plot(freq, traceData, 'y')
+	plt.plot(freq, trace, 'y')
 	plt.xlabel('Frequency (Hz)')
 	plt.ylabel('Amplitude (dBm)')
 	plt.title('Spectrum')
 
+	#plot the limit mask
+	plt.plot(freq, mask.project(specSet), 'r')
+
 	#annotate measurement
 	plt.axvline(x=peakPowerFreq)
+	plt.plot(peakTable.freq, peakTable.power, 'rv')
 	text_x = specSet.actualStartFreq + specSet.span/20
 	plt.text(text_x, peakPower, 
 		'Peak power in spectrum: %4.3f dBm @ %5.4f MHz' % (peakPower, peakPowerFreq/1e6),
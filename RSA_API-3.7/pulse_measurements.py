@@ -0,0 +1,235 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Pulse Measurements
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Vectorized pulse edge detection and pulse parameter measurements for
+block IQ records, either one record or a 2-D stack of records.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays, so it
+can be imported by any of the acquisition scripts.
+"""
+
+import numpy as np
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#one entry per pulse returned by measure_pulses()
+#times are in seconds, powers in dBm and droop in percent
+PULSE_DTYPE = np.dtype([('record', np.int32), 
+    ('risingIndex', np.int64), 
+    ('fallingIndex', np.int64),
+    ('width', np.float64), 
+    ('pri', np.float64), 
+    ('dutyCycle', np.float64),
+    ('riseTime', np.float64), 
+    ('fallTime', np.float64),
+    ('peakPower', np.float64), 
+    ('avgPower', np.float64),
+    ('droop', np.float64)])
+
+
+def iq_to_dbm(I, Q):
+    #power in dBm
+    #10log(Vrms^2/(R*1mW)
+    #There's an "extra" factor of 2 in the denominator from the RMS conversion
+    return 10*np.log10(iq_to_mw(I, Q))
+
+
+def iq_to_mw(I, Q):
+    #same conversion as iq_to_dbm() without the log
+    return (I**2+Q**2)/(2*50*1e-3)
+
+
+def find_pulse_edges(data, thresh, hysteresis=1.0):
+    """
+    Finds every complete pulse in a dBm envelope in a single pass.
+
+    The detection level is thresh dB below the peak of the record, the same
+    reference the old pulse_width_finder() used. The envelope has to rise
+    above level + hysteresis/2 to count as "on" and fall below
+    level - hysteresis/2 to count as "off", so noise riding on the level
+    doesn't produce runt pulses.
+
+    Returns (risingIndices, fallingIndices, widths) as integer arrays.
+    risingIndices are the first samples above the upper level,
+    fallingIndices are the first samples below the lower level and widths
+    are in samples. Pulses that are already on at the start of the record
+    or still on at the end are incomplete and are not reported.
+    """
+    records, risingIndices, fallingIndices = find_pulse_edges_batch(
+        np.asarray(data)[np.newaxis], thresh, hysteresis)
+    return risingIndices, fallingIndices, fallingIndices - risingIndices
+
+
+def find_pulse_edges_batch(data, thresh, hysteresis=1.0):
+    """
+    Same as find_pulse_edges() for a 2-D stack of records, one per row.
+    Each record gets its own detection level from its own peak.
+    Returns (records, risingIndices, fallingIndices), where records is the
+    row each pulse was found in.
+    """
+    data = np.asarray(data)
+    dPoint = np.amax(data, axis=1) - thresh
+    state = hysteresis_state(data, (dPoint + hysteresis/2.0)[:, np.newaxis],
+        (dPoint - hysteresis/2.0)[:, np.newaxis])
+
+    #+1 where the state goes low->high, -1 where it goes high->low
+    #edges alternate within a record, so a rising edge followed by another
+    #edge in the same record is always a complete pulse
+    edges = np.diff(state, axis=1)
+    rows, cols = np.nonzero(edges)
+    rising = edges[rows, cols] == 1
+    complete = rising[:-1] & (rows[:-1] == rows[1:])
+
+    records = rows[:-1][complete]
+    risingIndices = cols[:-1][complete] + 1
+    fallingIndices = cols[1:][complete] + 1
+    return records, risingIndices, fallingIndices
+
+
+def hysteresis_state(data, upper, lower):
+    """
+    On/off state of each sample of a 2-D stack of records (one per row):
+    1 above upper, 0 below lower, and samples in between hold the last
+    state. Samples before the first one outside the band take its state.
+    upper and lower broadcast against data. Returns int8 of data's shape.
+    """
+    #the hold is done by forward-filling the index of the most recent
+    #sample in each record that was outside the hysteresis band
+    above = data > upper
+    decided = above | (data < lower)
+    lastDecided = np.where(decided, np.arange(data.shape[1]), 0)
+
+    #samples before the first decision take the first decided state
+    lastDecided[:, 0] = np.argmax(decided, axis=1)
+    np.maximum.accumulate(lastDecided, axis=1, out=lastDecided)
+
+    rows = np.arange(data.shape[0])[:, np.newaxis]
+    return above[rows, lastDecided].astype(np.int8)
+
+
+def measure_pulses(I, Q, sampleRate, thresh=10, hysteresis=1.0, 
+    edgeWindow=64):
+    """
+    Measures every complete pulse in one or more IQ records.
+
+    I and Q are 1-D records or 2-D stacks of records (one record per row),
+    e.g. several IQBLK_GetIQDataDeinterleaved() results stacked together.
+    Pulses are found with find_pulse_edges_batch() using thresh and
+    hysteresis in dB. Rise and fall times are measured between 10% and 90%
+    of the pulse's peak voltage, looking edgeWindow samples either side of
+    each threshold crossing. Droop compares the mean voltage over 10-30% of
+    the pulse width with the mean over 70-90%.
+
+    Returns a record array with PULSE_DTYPE fields, one entry per pulse.
+    PRI and duty cycle are NaN for the last pulse of each record, and rise
+    and fall times are NaN when the edge doesn't fit in the search window.
+    """
+    I = np.atleast_2d(I)
+    Q = np.atleast_2d(Q)
+    numRecords, recordLength = I.shape
+    mW = iq_to_mw(I.astype(np.float64), Q.astype(np.float64))
+
+    records, rIdx, fIdx = find_pulse_edges_batch(10*np.log10(mW), thresh, 
+        hysteresis)
+    pulses = np.zeros(len(rIdx), dtype=PULSE_DTYPE).view(np.recarray)
+    if len(rIdx) == 0:
+        return pulses
+
+    pulses.record = records
+    pulses.risingIndex = rIdx
+    pulses.fallingIndex = fIdx
+    pulses.width = (fIdx - rIdx)/float(sampleRate)
+
+    #PRI is the spacing of consecutive rising edges in the same record
+    pulses.pri = np.nan
+    sameRecord = records[1:] == records[:-1]
+    pulses.pri[:-1][sameRecord] = (np.diff(rIdx)/float(sampleRate))[sameRecord]
+    pulses.dutyCycle = pulses.width/pulses.pri
+
+    #peak and average power over [rising, falling) of every pulse at once,
+    #using offsets into the flattened stack of records
+    flatMW = mW.ravel()
+    rFlat = records*recordLength + rIdx
+    fFlat = records*recordLength + fIdx
+    bounds = np.empty(2*len(rIdx), dtype=np.intp)
+    bounds[0::2] = rFlat
+    bounds[1::2] = fFlat
+    peakMW = np.maximum.reduceat(flatMW, bounds)[0::2]
+    cumMW = np.concatenate(([0], np.cumsum(flatMW)))
+    pulses.peakPower = 10*np.log10(peakMW)
+    pulses.avgPower = 10*np.log10((cumMW[fFlat] - cumMW[rFlat])/(fIdx - rIdx))
+
+    #everything else is done on voltage normalized to each pulse's peak
+    volts = np.sqrt(mW)
+    peakVolts = np.sqrt(peakMW)
+
+    #droop from the mean voltage near the start and end of the pulse top
+    width = fIdx - rIdx
+    cumVolts = np.concatenate(([0], np.cumsum(volts.ravel())))
+    early = _segment_mean(cumVolts, rFlat + width//10, rFlat + 3*width//10)
+    late = _segment_mean(cumVolts, rFlat + 7*width//10, rFlat + 9*width//10)
+    pulses.droop = 100*(early - late)/early
+
+    #search windows can't run into the neighbouring pulses
+    prevFalling = np.zeros_like(rIdx)
+    prevFalling[1:][sameRecord] = fIdx[:-1][sameRecord]
+    nextRising = np.empty_like(fIdx)
+    nextRising.fill(recordLength)
+    nextRising[:-1][sameRecord] = rIdx[1:][sameRecord]
+
+    offsets = np.arange(-edgeWindow, edgeWindow)
+    riseCols = rIdx[:, np.newaxis] + offsets
+    fallCols = fIdx[:, np.newaxis] + offsets
+    riseWindow = _edge_window(volts, records, riseCols, 
+        prevFalling[:, np.newaxis], fIdx[:, np.newaxis])/peakVolts[:, np.newaxis]
+    fallWindow = _edge_window(volts, records, fallCols, 
+        rIdx[:, np.newaxis], nextRising[:, np.newaxis])/peakVolts[:, np.newaxis]
+
+    pulses.riseTime = _rise_samples(riseWindow)/float(sampleRate)
+    pulses.fallTime = _rise_samples(fallWindow[:, ::-1])/float(sampleRate)
+
+    return pulses
+
+
+def _segment_mean(cumsum, start, stop):
+    #mean of the samples in [start, stop) from a cumulative sum that has a
+    #leading zero, always averaging at least one sample
+    stop = np.maximum(stop, start + 1)
+    return (cumsum[stop] - cumsum[start])/(stop - start)
+
+
+def _edge_window(data, records, cols, lowerBound, upperBound):
+    #gathers a window of samples around each edge, samples outside 
+    #[lowerBound, upperBound) are NaN so they never satisfy a comparison
+    valid = (cols >= lowerBound) & (cols < upperBound)
+    window = data[records[:, np.newaxis], np.clip(cols, 0, data.shape[1]-1)]
+    window[~valid] = np.nan
+    return window
+
+
+def _rise_samples(window):
+    #10-90% transition time in samples of a rising edge in each row of 
+    #window (falling edges are passed in time-reversed). The 90% point is the
+    #first sample at or above 0.9, the 10% point is the last sample at or
+    #below 0.1 before it, and both are linearly interpolated between samples.
+    rows = np.arange(window.shape[0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        above90 = window >= 0.9
+        k90 = np.argmax(above90, axis=1)
+        below10 = (window <= 0.1) & (np.arange(window.shape[1]) < k90[:, np.newaxis])
+        k10 = window.shape[1] - 1 - np.argmax(below10[:, ::-1], axis=1)
+        found = above90.any(axis=1) & below10.any(axis=1)
+
+        #both crossings lie between sample k and k+1
+        k90 = np.maximum(k90 - 1, 0)
+        k10 = np.minimum(k10, window.shape[1] - 2)
+        t90 = k90 + (0.9 - window[rows, k90])/(window[rows, k90+1] - window[rows, k90])
+        t10 = k10 + (0.1 - window[rows, k10])/(window[rows, k10+1] - window[rows, k10])
+    return np.where(found, t90 - t10, np.nan)
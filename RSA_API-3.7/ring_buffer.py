@@ -0,0 +1,166 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Ring Buffers
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Fixed-capacity history buffers for long running monitors, so memory use
+stays constant no matter how long the script runs.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#one entry per trace in PeakHistory
+PEAK_DTYPE = np.dtype([('timestamp', np.float64),
+    ('peakPower', np.float32),
+    ('peakFreq', np.float64),
+    ('acqDataStatus', np.uint16)])
+
+#one entry per rollup period, returned by PeakHistory.rollup()
+ROLLUP_DTYPE = np.dtype([('timestamp', np.float64),
+    ('minPower', np.float32),
+    ('maxPower', np.float32),
+    ('meanPower', np.float32),
+    ('count', np.int32)])
+
+
+class RingBuffer(object):
+    """
+    Fixed-capacity circular buffer of NumPy rows with O(1) append.
+
+    Every row is stored twice, at slot i and slot i+capacity, so the newest
+    n rows are always one contiguous slice of the storage and latest()
+    returns them oldest first as a view without copying anything. The
+    price is twice the memory and two writes per append. Rows can be
+    scalars, structured records or arrays of shape rowShape.
+    """
+    def __init__(self, capacity, dtype, rowShape=()):
+        self.capacity = capacity
+        self.data = np.zeros((2*capacity,) + tuple(rowShape), dtype=dtype)
+        #total number of rows ever appended
+        self.head = 0
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def append(self, row):
+        i = self.head % self.capacity
+        self.data[i] = row
+        self.data[i + self.capacity] = row
+        self.head += 1
+
+    def extend(self, rows):
+        #appends several rows at once, only the last capacity rows are kept
+        rows = rows[-self.capacity:]
+        i = (self.head + np.arange(len(rows))) % self.capacity
+        self.data[i] = rows
+        self.data[i + self.capacity] = rows
+        self.head += len(rows)
+
+    def replace_last(self, row):
+        #overwrites the newest row in place
+        i = (self.head - 1) % self.capacity
+        self.data[i] = row
+        self.data[i + self.capacity] = row
+
+    def latest(self, n=None):
+        #view of the newest n rows (all stored rows by default), oldest first
+        #the view is only valid until the next append() overwrites it
+        if n is None or n > len(self):
+            n = len(self)
+        end = self.head % self.capacity + self.capacity
+        return self.data[end - n:end]
+
+    def clear(self):
+        self.head = 0
+
+
+class _Rollup(object):
+    #min/max/mean of peak power over fixed time periods, one entry per period
+    def __init__(self, period, capacity):
+        self.period = period
+        self.history = RingBuffer(capacity, ROLLUP_DTYPE)
+        self.bucket = None
+        #True once the current bucket has a row in history, from flush()
+        self.stored = False
+
+    def add(self, timestamp, power):
+        bucket = np.floor(timestamp/self.period)*self.period
+        if bucket != self.bucket:
+            self.flush()
+            self.bucket = bucket
+            self.stored = False
+            self.minPower = self.maxPower = self.sumPower = power
+            self.count = 1
+        else:
+            self.minPower = min(self.minPower, power)
+            self.maxPower = max(self.maxPower, power)
+            self.sumPower += power
+            self.count += 1
+
+    def flush(self):
+        #the bucket stays open, so records that still arrive in the same
+        #period update its row instead of adding a second one
+        if self.bucket is not None:
+            row = (self.bucket, self.minPower, self.maxPower,
+                self.sumPower/float(self.count), self.count)
+            if self.stored:
+                self.history.replace_last(row)
+            else:
+                self.history.append(row)
+                self.stored = True
+
+
+class PeakHistory(object):
+    """
+    Peak power and frequency history of a spectrum monitor.
+
+    Keeps the last capacity (timestamp, peakPower, peakFreq, acqDataStatus)
+    records and, for each period in rollupPeriods (same units as the
+    timestamps), the min/max/mean peak power of the last rollupCapacity
+    periods. A period's rollup is stored once a record from a later period
+    arrives, or on flush(); records of the same period that arrive after
+    a flush() update that stored rollup.
+    """
+    def __init__(self, capacity, rollupPeriods=(), rollupCapacity=1440):
+        self.records = RingBuffer(capacity, PEAK_DTYPE)
+        self._rollups = [_Rollup(period, rollupCapacity)
+            for period in rollupPeriods]
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, timestamp, peakPower, peakFreq, acqDataStatus=0):
+        self.records.append((timestamp, peakPower, peakFreq, acqDataStatus))
+        for rollup in self._rollups:
+            rollup.add(timestamp, peakPower)
+
+    def latest(self, n=None):
+        #zero-copy view of the newest n records, oldest first
+        return self.records.latest(n)
+
+    def since(self, timestamp):
+        #zero-copy view of the stored records at or after timestamp
+        records = self.records.latest()
+        start = np.searchsorted(records['timestamp'], timestamp)
+        return records[start:]
+
+    def rollup(self, period, n=None):
+        #newest n completed rollups for the given period, oldest first
+        for r in self._rollups:
+            if r.period == period:
+                return r.history.latest(n)
+        raise ValueError('No rollup with period {}'.format(period))
+
+    def flush(self):
+        #stores the partially filled current period of every rollup
+        for rollup in self._rollups:
+            rollup.flush()
@@ -0,0 +1,106 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Settings-Keyed Array Cache
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Arrays that only depend on the instrument settings (frequency axes, DPX
+bitmap axes, window weights, mask projections, channel weight matrices)
+are built once per settings and kept in a small LRU cache keyed by the
+fields of the Spectrum_Settings/DPX_SettingStruct they came from, so
+switching back and forth between a few configurations only costs a
+dictionary lookup.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+from collections import OrderedDict
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+def settings_key(settings):
+    #hashable snapshot of every field of a ctypes settings structure
+    if settings is None:
+        return ()
+    return tuple(getattr(settings, field[0]) for field in settings._fields_)
+
+
+class SettingsCache(object):
+    """
+    Least recently used cache of values derived from settings structures.
+
+    get() returns the value stored for (name, settings, extra key values)
+    or calls build() to make it. settings can be None when the extra
+    values are the whole key. Once more than maxEntries values are
+    stored, the one used longest ago is dropped. Cached arrays are shared
+    by every caller, so they're made read-only.
+    """
+    def __init__(self, maxEntries=16):
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name, settings, build, *extra):
+        key = (name, settings_key(settings)) + extra
+        try:
+            value = self._entries.pop(key)
+            self.hits += 1
+        except KeyError:
+            value = build()
+            for array in (value if isinstance(value, tuple) else (value,)):
+                if isinstance(array, np.ndarray):
+                    array.setflags(write=False)
+            self.misses += 1
+        #(re)inserting moves the key to the most recently used end
+        self._entries[key] = value
+        if len(self._entries) > self.maxEntries:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+#shared by the functions below
+_cache = SettingsCache(32)
+
+
+def frequency_axis(specSet):
+    """
+    Frequency of every trace point of a Spectrum_Settings, in Hz.
+    Built from traceLength rather than np.arange() with a float step,
+    which can come out one point too long or too short.
+    """
+    return _cache.get('freq', specSet, lambda: specSet.actualStartFreq +
+        specSet.actualFreqStepSize*np.arange(specSet.traceLength))
+
+
+def dpx_axes(dpxSet, cf, span, yBottom, yTop):
+    """
+    (freq, amp) axes of the DPX spectrum bitmap for a DPX_SettingStruct:
+    bitmapWidth frequencies across span around cf and bitmapHeight
+    amplitudes from yBottom to yTop. DPX_SettingStruct doesn't hold the
+    frequency or amplitude range, so those are part of the key.
+    """
+    return _cache.get('dpx', dpxSet, lambda: (
+        np.linspace(cf - span/2.0, cf + span/2.0, dpxSet.bitmapWidth),
+        np.linspace(yBottom, yTop, dpxSet.bitmapHeight)),
+        cf, span, yBottom, yTop)
+
+
+def window_weights(length, window='hanning'):
+    #normalized NumPy window (np.hanning, np.blackman...) of length points,
+    #scaled to unit mean so windowing doesn't change the average power
+    def build():
+        weights = getattr(np, window)(length)
+        return weights/np.mean(weights)
+    return _cache.get(window, None, build, length)
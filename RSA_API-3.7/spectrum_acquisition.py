@@ -0,0 +1,143 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Spectrum Acquisition
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Spectrum trace acquisition that runs independently of whatever is done
+with the traces afterwards (plotting, measurements, logging).
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected
+and the spectrum settings have been applied.
+"""
+
+from ctypes import *
+import numpy as np
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#create Spectrum_Settings data structure
+class Spectrum_Settings(Structure):
+    _fields_ = [('span', c_double), 
+    ('rbw', c_double),
+    ('enableVBW', c_bool), 
+    ('vbw', c_double),
+    ('traceLength', c_int), 
+    ('window', c_int),
+    ('verticalUnit', c_int), 
+    ('actualStartFreq', c_double), 
+    ('actualStopFreq', c_double),
+    ('actualFreqStepSize', c_double), 
+    ('actualRBW', c_double),
+    ('actualVBW', c_double), 
+    ('actualNumIQSamples', c_double)]
+
+class Spectrum_TraceInfo(Structure):
+    _fields_ = [('timestamp', c_int64), ('acqDataStatus', c_uint16)]
+
+
+def iter_traces(rsa, traceLength, timeoutMsec=100, stop=None):
+    """
+    Generator of (trace, traceInfo) from back-to-back spectrum acquisitions.
+
+    SPECTRUM_AcquireTrace() for the next trace is sent as soon as the 
+    current one has been fetched, before it's handed to the caller, so the
+    instrument acquires the next trace while the caller is processing this
+    one. trace is a float32 NumPy array and traceInfo a Spectrum_TraceInfo.
+    Both are reused, so they're only valid until the next iteration; copy
+    them to keep them. Iteration ends when the optional threading.Event
+    stop is set. Send DEVICE_Run() first.
+    """
+    ready = c_bool(False)
+    timeoutMsec = c_int(timeoutMsec)
+    outTracePoints = c_int()
+    traceInfo = Spectrum_TraceInfo()
+    trace = np.empty(traceLength, dtype=np.float32)
+    traceData = trace.ctypes.data_as(POINTER(c_float))
+
+    rsa.SPECTRUM_AcquireTrace()
+    while stop is None or not stop.is_set():
+        ready.value = False
+        while ready.value == False:
+            rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
+            if stop is not None and stop.is_set():
+                return
+        rsa.SPECTRUM_GetTrace(c_int(0), traceLength, traceData, 
+            byref(outTracePoints))
+        rsa.SPECTRUM_GetTraceInfo(byref(traceInfo))
+
+        #re-arm before handing the trace over
+        rsa.SPECTRUM_AcquireTrace()
+        yield trace, traceInfo
+
+
+class SpectrumWorker(threading.Thread):
+    """
+    Acquires spectrum traces in a background thread and pushes
+    (trace, timestamp, acqDataStatus) tuples into a bounded queue.
+
+    When the consumer falls behind, the oldest queued trace is dropped to
+    make room for the newest one, so the queue never holds stale data and
+    acquisition never waits on the consumer. Start it after DEVICE_Run().
+    """
+    def __init__(self, rsa, traceLength, maxQueue=16, timeoutMsec=100):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.rsa = rsa
+        self.traceLength = traceLength
+        self.timeoutMsec = timeoutMsec
+        self.traces = queue.Queue(maxsize=maxQueue)
+
+        #counters, only written by the worker thread
+        self.acquired = 0
+        self.dropped = 0
+        self._stopEvent = threading.Event()
+
+    def stop(self):
+        self._stopEvent.set()
+        self.join()
+
+    def drain(self, timeout=None):
+        """
+        Returns every queued trace, oldest first. Waits up to timeout
+        seconds for the first one and returns an empty list if none came.
+        """
+        items = []
+        try:
+            items.append(self.traces.get(timeout=timeout))
+            while True:
+                items.append(self.traces.get_nowait())
+        except queue.Empty:
+            pass
+        return items
+
+    def run(self):
+        for trace, traceInfo in iter_traces(self.rsa, self.traceLength, 
+            self.timeoutMsec, self._stopEvent):
+            #iter_traces() reuses its array, every queued trace needs a copy
+            self.acquired += 1
+            self._put((trace.copy(), traceInfo.timestamp, 
+                traceInfo.acqDataStatus))
+
+    def _put(self, item):
+        #drop the oldest trace rather than block the acquisition
+        while True:
+            try:
+                self.traces.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.traces.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
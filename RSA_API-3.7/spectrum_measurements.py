@@ -0,0 +1,198 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Spectrum Measurements
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Vectorized measurements on spectrum traces from SPECTRUM_GetTrace().
+Every function takes a single trace or a 2-D array with one trace per row
+so a whole batch of recorded traces can be measured in one call.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#one entry per peak returned by find_peaks()
+PEAK_TABLE_DTYPE = np.dtype([('row', np.int32),
+    ('index', np.int32),
+    ('freq', np.float64),
+    ('power', np.float64)])
+
+
+def trace_to_mw(trace, specSet):
+    #convert dBm to mW and normalize to span
+    #specSet is the Spectrum_Settings the trace was acquired with
+    return 10**(np.asarray(trace)/10.0)*specSet.span/specSet.actualRBW/specSet.traceLength
+
+
+def occupied_bandwidth(trace, freq, specSet, obwpcnt=0.99):
+    """
+    Occupied bandwidth containing obwpcnt of the total trace power, with
+    (1-obwpcnt)/2 of the power left outside on each side.
+
+    The edges are found on the cumulative power with searchsorted() and
+    interpolated inside the edge bin, treating each bin's power as spread
+    evenly across its width. freq is the frequency of each trace point.
+    Returns (f1, f2, obw), scalars for a single trace or arrays with one
+    entry per row for a 2-D array of traces.
+    """
+    trace = np.asarray(trace)
+    mW = trace_to_mw(trace, specSet).reshape(-1, trace.shape[-1])
+    numTraces, traceLength = mW.shape
+
+    #cumulative power normalized to 0..1 in each trace
+    #offsetting each trace by 2 keeps the whole flattened array sorted, so
+    #one searchsorted() call finds the edges of every trace at once
+    cumPower = np.cumsum(mW, axis=1)
+    cumPower /= cumPower[:, -1:]
+    rowOffset = 2.0*np.arange(numTraces)
+    targets = np.array([(1 - obwpcnt)/2.0, (1 + obwpcnt)/2.0])
+    flatIdx = np.searchsorted((cumPower + rowOffset[:, np.newaxis]).ravel(),
+        (targets + rowOffset[:, np.newaxis]).ravel())
+    flatIdx = np.minimum(flatIdx, cumPower.size - 1)
+
+    #fraction of the edge bin's power that falls inside the target
+    rows = np.repeat(np.arange(numTraces), 2)
+    cols = flatIdx - rows*traceLength
+    prev = np.where(cols > 0, cumPower[rows, np.maximum(cols - 1, 0)], 0)
+    binPower = cumPower[rows, cols] - prev
+    frac = np.where(binPower > 0, (np.tile(targets, numTraces) - prev)/binPower, 0)
+
+    df = freq[1] - freq[0]
+    edges = (freq[cols] - df/2.0 + frac*df).reshape(numTraces, 2)
+    f1 = edges[:, 0].reshape(trace.shape[:-1])[()]
+    f2 = edges[:, 1].reshape(trace.shape[:-1])[()]
+    return f1, f2, f2 - f1
+
+
+def xdb_bandwidth(trace, freq, xdb=26.0):
+    """
+    Bandwidth between the points where the trace first drops xdb below its
+    peak on either side of the peak, linearly interpolated in dB between
+    bins. If the trace never drops that far on one side, that edge is the
+    end of the trace. Returns (f1, f2, bw) like occupied_bandwidth().
+    """
+    trace = np.asarray(trace)
+    data = trace.reshape(-1, trace.shape[-1])
+    numTraces, traceLength = data.shape
+    rows = np.arange(numTraces)
+    cols = np.arange(traceLength)
+
+    peakIdx = np.argmax(data, axis=1)
+    level = (data[rows, peakIdx] - xdb)[:, np.newaxis]
+    below = data < level
+
+    #last bin below the level left of the peak, first one right of it
+    left = below & (cols < peakIdx[:, np.newaxis])
+    right = below & (cols > peakIdx[:, np.newaxis])
+    hasLeft = left.any(axis=1)
+    hasRight = right.any(axis=1)
+    k1 = traceLength - 1 - np.argmax(left[:, ::-1], axis=1)
+    k2 = np.argmax(right, axis=1)
+
+    #interpolate between the bin below the level and its neighbour above
+    level = level[:, 0]
+    k1n = np.minimum(k1 + 1, traceLength - 1)
+    k2n = np.maximum(k2 - 1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f1 = freq[k1] + (freq[k1n] - freq[k1])*(level - data[rows, k1])/(
+            data[rows, k1n] - data[rows, k1])
+        f2 = freq[k2] + (freq[k2n] - freq[k2])*(level - data[rows, k2])/(
+            data[rows, k2n] - data[rows, k2])
+    f1 = np.where(hasLeft, f1, freq[0]).reshape(trace.shape[:-1])[()]
+    f2 = np.where(hasRight, f2, freq[-1]).reshape(trace.shape[:-1])[()]
+    return f1, f2, f2 - f1
+
+
+def find_peaks(trace, freq, numPeaks=10, excursion=6.0, threshold=-np.inf):
+    """
+    Peak table of one trace or a 2-D array of traces (one per row).
+
+    A peak is a local maximum at or above threshold that the trace drops at
+    least excursion dB below before reaching a higher peak. Only the sides
+    that lead to a higher peak are checked; a side that runs to the end of
+    the trace without one needs no drop. Up to numPeaks peaks are returned per
+    trace, highest first. Frequency and power are refined with a parabola
+    through the peak bin and its neighbours.
+
+    Returns a record array with PEAK_TABLE_DTYPE fields: the row of the
+    trace (0 for a single trace), the trace point index, the interpolated
+    frequency and power.
+    """
+    trace = np.asarray(trace)
+    data = trace.reshape(-1, trace.shape[-1]).astype(np.float64)
+
+    #interior local maxima (plateaus count once, at their left end)
+    isMax = (data[:, 1:-1] > data[:, :-2]) & (data[:, 1:-1] >= data[:, 2:])
+    rows, cols = np.nonzero(isMax)
+    cols += 1
+    if len(rows) > 0:
+        rows, cols = _excursion_filter(data, rows, cols, excursion)
+    keep = data[rows, cols] >= threshold
+    rows = rows[keep]
+    cols = cols[keep]
+
+    #highest first within each trace, then keep the first numPeaks per trace
+    values = data[rows, cols]
+    order = np.lexsort((-values, rows))
+    rows = rows[order]
+    cols = cols[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    rows = rows[rank < numPeaks]
+    cols = cols[rank < numPeaks]
+
+    #parabolic interpolation through the peak and its neighbours
+    left = data[rows, cols - 1]
+    center = data[rows, cols]
+    right = data[rows, cols + 1]
+    denom = left - 2*center + right
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where(denom != 0, 0.5*(left - right)/denom, 0)
+
+    peaks = np.zeros(len(rows), dtype=PEAK_TABLE_DTYPE).view(np.recarray)
+    peaks.row = rows
+    peaks.index = cols
+    peaks.freq = freq[cols] + delta*(freq[1] - freq[0])
+    peaks.power = center - 0.25*(left - right)*delta
+    return peaks
+
+
+def _excursion_filter(data, rows, cols, excursion):
+    #drops local maxima that don't stand excursion dB above the valleys on
+    #both sides. Each pass removes every candidate that is too close to a
+    #higher neighbouring candidate and merges the valleys around it, until
+    #nothing changes. valleys[k] is the minimum between candidates k and
+    #k+1, -inf between candidates in different traces.
+    flat = data.ravel()
+    pos = rows*data.shape[1] + cols
+    values = flat[pos]
+    valleys = np.minimum.reduceat(flat, pos)[:-1]
+    valleys[rows[1:] != rows[:-1]] = -np.inf
+
+    while len(values) > 1:
+        leftValley = np.concatenate(([-np.inf], valleys))
+        rightValley = np.concatenate((valleys, [-np.inf]))
+        leftValue = np.concatenate(([-np.inf], values[:-1]))
+        rightValue = np.concatenate((values[1:], [-np.inf]))
+
+        #of two equal neighbours the right one goes
+        remove = (((values - leftValley) < excursion) & (leftValue >= values)) | \
+            (((values - rightValley) < excursion) & (rightValue > values))
+        if not remove.any():
+            break
+        kept = np.flatnonzero(~remove)
+        if len(kept) > 1:
+            valleys = np.minimum.reduceat(valleys[:kept[-1]], kept[:-1])
+        else:
+            valleys = valleys[:0]
+        values = values[kept]
+        rows = rows[kept]
+        cols = cols[kept]
+    return rows, cols
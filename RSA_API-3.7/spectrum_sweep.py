@@ -0,0 +1,139 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Stepped Spectrum Sweep
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Wideband spectrum sweeps wider than the 40 MHz real-time span. The sweep
+retunes the center frequency in steps of one span and stitches the traces
+into one preallocated frequency/amplitude array. The trace length of each
+step is set from the RBW so no signal falls between trace points.
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected.
+"""
+
+from ctypes import *
+import numpy as np
+import time
+from settings_cache import frequency_axis
+from instrument_state import InstrumentState
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#trace lengths the sweep picks from, the default and the longest trace
+MIN_TRACE_LENGTH = 801
+MAX_TRACE_LENGTH = 64001
+
+
+def plan_sweep(startFreq, stopFreq, rbw, stepSpan=40e6):
+    """
+    Steps needed to cover startFreq to stopFreq with trace points no more
+    than rbw/2 apart. The trace length of each step is the smallest odd
+    length (at least MIN_TRACE_LENGTH) that does that over stepSpan; when
+    even MAX_TRACE_LENGTH can't, the step span is narrowed instead.
+    Returns (centers, stepSpan, traceLength).
+    """
+    traceLength = int(np.ceil(2*stepSpan/rbw)) + 1
+    if traceLength > MAX_TRACE_LENGTH:
+        traceLength = MAX_TRACE_LENGTH
+        stepSpan = (traceLength - 1)*rbw/2.0
+    traceLength = max(traceLength + (traceLength + 1) % 2, MIN_TRACE_LENGTH)
+
+    numSteps = max(int(np.ceil((stopFreq - startFreq)/stepSpan)), 1)
+    centers = startFreq + stepSpan/2.0 + stepSpan*np.arange(numSteps)
+    return centers, stepSpan, traceLength
+
+
+class SpectrumSweep(object):
+    """
+    Stepped sweep from startFreq to stopFreq with the given RBW. The
+    steps, their span and the trace length come from plan_sweep(), unless
+    traceLength is given.
+
+    configure() applies the spectrum settings once and works out which
+    bins of each step's trace are kept: the steps are exactly stepSpan
+    apart, so keeping the bins in [-stepSpan/2, stepSpan/2) around each
+    center frequency trims the overlap and leaves one evenly spaced
+    frequency grid. That grid and the amplitude array are allocated once.
+    sweep() then only retunes, acquires and copies each trace into place.
+
+    All configuration goes through an InstrumentState (a new one unless
+    state is given), so a sweep with a single step doesn't retune at all
+    and repeated configure() calls skip the settings that didn't change.
+    """
+    def __init__(self, rsa, startFreq, stopFreq, rbw, stepSpan=40e6, 
+        traceLength=None, timeoutMsec=100, state=None):
+        self.rsa = rsa
+        if state is None:
+            state = InstrumentState(rsa)
+        self.state = state
+        self.startFreq = startFreq
+        self.stopFreq = stopFreq
+        self.rbw = rbw
+        self.centers, self.stepSpan, self.traceLength = plan_sweep(startFreq, 
+            stopFreq, rbw, stepSpan)
+        if traceLength is not None:
+            self.traceLength = traceLength
+        self.timeoutMsec = timeoutMsec
+        self.specSet = None
+
+    def configure(self):
+        state = self.state
+        state.set(centerFreq=self.centers[0])
+        if state.specSet is None:
+            state.enable_spectrum()
+        state.set_spectrum(span=self.stepSpan, rbw=self.rbw, 
+            traceLength=self.traceLength)
+        state.apply()
+        specSet = self.specSet = state.spectrum_settings()
+
+        #trace point offsets from the center frequency, the same every step
+        df = specSet.actualFreqStepSize
+        offsets = frequency_axis(specSet) - self.centers[0]
+        self.keepStart, self.keepStop = np.searchsorted(offsets, 
+            [-self.stepSpan/2.0 - df/2, self.stepSpan/2.0 - df/2])
+        keep = offsets[self.keepStart:self.keepStop]
+
+        #stitched frequency grid, trimmed to the requested stop frequency
+        freq = (self.centers[:, np.newaxis] + keep).ravel()
+        self.numPoints = np.searchsorted(freq, self.stopFreq, side='right')
+        self.freq = freq[:self.numPoints]
+        self.amplitude = np.empty(len(freq), dtype=np.float32)
+        self.trace = np.empty(specSet.traceLength, dtype=np.float32)
+        return specSet
+
+    def sweep(self):
+        """
+        Runs one sweep. Returns (freq, amplitude, sweepTime) where freq and
+        amplitude are views of arrays reused by every sweep.
+        """
+        rsa = self.rsa
+        ready = c_bool(False)
+        timeoutMsec = c_int(self.timeoutMsec)
+        outTracePoints = c_int()
+        traceData = self.trace.ctypes.data_as(POINTER(c_float))
+        pointsPerStep = self.keepStop - self.keepStart
+
+        start = time.time()
+        for step, cf in enumerate(self.centers):
+            #stop/retune/run, or nothing if the instrument is already there
+            self.state.set(centerFreq=cf)
+            self.state.apply()
+            self.state.run()
+            rsa.SPECTRUM_AcquireTrace()
+            ready.value = False
+            while ready.value == False:
+                rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
+            rsa.SPECTRUM_GetTrace(c_int(0), self.specSet.traceLength, 
+                traceData, byref(outTracePoints))
+            self.amplitude[step*pointsPerStep:(step+1)*pointsPerStep] = \
+                self.trace[self.keepStart:self.keepStop]
+        sweepTime = time.time() - start
+        self.state.stop()
+
+        return self.freq, self.amplitude[:self.numPoints], sweepTime
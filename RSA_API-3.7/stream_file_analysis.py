@@ -0,0 +1,91 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Streamed File Analysis
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0, MatPlotLib 1.4.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Power vs time, bursts and a spectrogram of an IQ file saved by
+streaming_file.py, processed in chunks on every CPU core.
+No instrument is needed.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+import time
+from chunk_processing import (process_file, power_vs_time, spectrogram,
+    burst_edges, merge_bursts)
+from stream_file_readers import open_stream_file
+
+
+def main():
+    """#################INITIALIZE VARIABLES#################"""
+    #chunkSize samples per task, a few MB per worker
+    chunkSize = 2**20
+    #power vs time resolution and burst detection level
+    pvtTime = 10e-6
+    burstLevel = -30
+    hysteresis = 1.0
+    #spectrogram FFT size, 50% overlap, rows averaged down to a plottable size
+    fftSize = 1024
+    hop = fftSize//2
+    maxRows = 1000
+
+
+    """#################PROCESS FILE#################"""
+    filename = input('Enter streamed IQ file name (.tiq/.siq/.siqh) in quotes.\n> ')
+    iqFile = open_stream_file(filename)
+    sampleRate = iqFile.sampleRate
+    numberSamples = len(iqFile)
+    iqFile.close()
+    print('{} IQ pairs at {} S/s ({} seconds)'.format(numberSamples, sampleRate,
+        numberSamples/sampleRate))
+
+    start = time.time()
+    blockSize = max(int(pvtTime*sampleRate), 1)
+    pvt = process_file(filename, power_vs_time, chunkSize, align=blockSize,
+        args=(blockSize,))
+
+    bursts = process_file(filename, burst_edges, chunkSize,
+        args=(burstLevel, hysteresis), merge=merge_bursts)
+
+    average = max(numberSamples//hop//maxRows, 1)
+    sgram = process_file(filename, spectrogram, chunkSize, after=fftSize - hop,
+        align=hop*average, args=(fftSize, hop, average))
+    print('Processing time: {} seconds.'.format(time.time() - start))
+
+    print('{} bursts above {} dBm'.format(len(bursts), burstLevel))
+    for burst in bursts[:10]:
+        print('Start: {:.6f} s, width: {:.3f} us'.format(
+            burst['risingIndex']/sampleRate, burst['width']/sampleRate*1e6))
+
+
+    """#################PLOTS#################"""
+    pvtAxis = np.arange(len(pvt))*blockSize/sampleRate
+    plt.figure(1)
+    plt.subplot(211)
+    plt.title('Power vs Time')
+    plt.plot(pvtAxis, pvt)
+    plt.plot(bursts['risingIndex']/sampleRate,
+        np.zeros(len(bursts)) + burstLevel, 'g^')
+    plt.plot(bursts['fallingIndex']/sampleRate,
+        np.zeros(len(bursts)) + burstLevel, 'rv')
+    plt.xlabel('Time (s)')
+    plt.ylabel('Power (dBm)')
+
+    plt.subplot(212)
+    plt.title('Spectrogram')
+    plt.imshow(sgram, aspect='auto', interpolation='nearest', origin='lower',
+        extent=[-sampleRate/2e6, sampleRate/2e6, 0,
+        len(sgram)*hop*average/sampleRate])
+    plt.xlabel('Frequency offset (MHz)')
+    plt.ylabel('Time (s)')
+    plt.tight_layout()
+    plt.show()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Streamed File Readers
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Readers for the files written by IQ streaming (.tiq, .siq, .siqh/.siqd)
+and IF streaming (.r3f). Only the header is parsed when a file is
+opened; the samples are a numpy.memmap, so multi-GB captures open
+instantly and any slice of samples is read from disk on demand.
+This file doesn't load RSA_API.dll, it only works on files.
+"""
+
+import numpy as np
+import os, re, struct
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#sample formats of IQSTREAM_SetOutputConfiguration() as named in the headers
+NUMBER_FORMATS = {'Int16': '<i2', 'Int32': '<i4', 'Single': '<f4',
+    'IQ-Int16': '<i2', 'IQ-Int32': '<i4', 'IQ-Single': '<f4'}
+
+
+class StreamFile(object):
+    """
+    Common interface of the readers. samples is the memory mapped sample
+    payload: (numberSamples, 2) interleaved I/Q for IQ files, or
+    (frames, samplesInFrame) real ADC samples for .r3f files. scale
+    converts the stored values to volts (IQ) or ADC volts (IF), and
+    header holds every parsed header field.
+
+    Every reader has read(start, count, scaled=True), which returns count
+    samples from sample index start as complex64 for IQ files or float32
+    for IF files (raw stored values if scaled=False). Only the requested
+    part of the file is read.
+    """
+    sampleRate = None
+    centerFreq = None
+    scale = 1.0
+
+    def __len__(self):
+        return self.numberSamples
+
+    def read_time(self, startSec, durationSec, scaled=True):
+        #same as read() with the slice given in seconds from the file start
+        start = int(round(startSec*self.sampleRate))
+        return self.read(start, int(round(durationSec*self.sampleRate)), scaled)
+
+    def close(self):
+        #drops the memmap, which closes the file once no views are left
+        self.samples = None
+
+
+class _IQFile(StreamFile):
+    #shared by the IQ formats, which differ only in their headers
+    def _map(self, filename, dtype, offset):
+        itemSize = np.dtype(dtype).itemsize
+        numberSamples = (os.path.getsize(filename) - offset)//(2*itemSize)
+        if self.numberSamples is not None:
+            numberSamples = min(numberSamples, self.numberSamples)
+        self.numberSamples = numberSamples
+        self.samples = np.memmap(filename, dtype=dtype, mode='r',
+            offset=offset, shape=(numberSamples, 2))
+
+    def read(self, start, count, scaled=True):
+        iq = self.samples[start:start + count]
+        if not scaled:
+            return np.array(iq)
+        out = np.empty(len(iq), dtype=np.complex64)
+        out.real = iq[:, 0]
+        out.imag = iq[:, 1]
+        out *= self.scale
+        return out
+
+
+class TiqFile(_IQFile):
+    """
+    .tiq file: an XML header followed by interleaved I/Q. The DataFile
+    element's offset attribute gives the start of the samples; the
+    sample format, scaling, rate and frequency come from the XML tags.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            first = f.read(1024).decode('latin-1')
+            match = re.search(r'offset="\s*(\d+)"', first)
+            if match is None:
+                raise ValueError('No data offset in {}'.format(filename))
+            offset = int(match.group(1))
+            f.seek(0)
+            text = f.read(offset).decode('latin-1')
+
+        #first occurrence of every simple <tag>value</tag>
+        self.header = {}
+        for tag, value in re.findall(r'<(\w+)(?:\s[^>]*)?>([^<]*)</\1>', text):
+            self.header.setdefault(tag, value.strip())
+        header = self.header
+        self.numberFormat = header.get('NumberFormat', 'Int16')
+        self.scale = float(header.get('Scaling', 1.0))
+        self.sampleRate = float(header['SamplingFrequency'])
+        if 'Frequency' in header:
+            self.centerFreq = float(header['Frequency'])
+        self.numberSamples = int(header['NumberSamples']) \
+            if 'NumberSamples' in header else None
+        self._map(filename, NUMBER_FORMATS[self.numberFormat], offset)
+
+
+def parse_siq_header(text):
+    """
+    Parses the key:value lines of a .siq/.siqh header. The first line,
+    RSASIQHT:<version>,<header size>, gives the size of the header in
+    bytes. Returns (fields, headerSize).
+    """
+    lines = text.replace('\r', '\n').split('\n')
+    key, value = lines[0].split(':', 1)
+    if key != 'RSASIQHT':
+        raise ValueError('Not a SIQ header: {}'.format(lines[0][:40]))
+    headerSize = int(value.split(',')[1])
+    fields = {}
+    for line in lines[1:]:
+        if ':' in line:
+            key, value = line.split(':', 1)
+            fields[key.strip()] = value.strip()
+    return fields, headerSize
+
+
+class SiqFile(_IQFile):
+    """
+    .siq file (header and samples in one file) or a .siqh/.siqd pair
+    (pass either one; the header is read from the .siqh and the samples,
+    with no header, from the .siqd).
+    """
+    def __init__(self, filename):
+        base, ext = os.path.splitext(filename)
+        ext = ext.lower()
+        if ext in ('.siqh', '.siqd'):
+            headerFile = base + '.siqh'
+            self.filename = base + '.siqd'
+        else:
+            headerFile = self.filename = filename
+
+        with open(headerFile, 'rb') as f:
+            first = f.read(64).decode('latin-1')
+            headerSize = int(first.split('\n')[0].split(':', 1)[1].split(',')[1])
+            f.seek(0)
+            text = f.read(headerSize).decode('latin-1').rstrip('\x00')
+        self.header, headerSize = parse_siq_header(text)
+        header = self.header
+
+        self.numberFormat = header.get('NumberFormat', 'IQ-Int16')
+        self.scale = float(header.get('DataScale', 1.0))
+        self.sampleRate = float(header['SampleRate'])
+        if 'CenterFrequency' in header:
+            self.centerFreq = float(header['CenterFrequency'])
+        self.numberSamples = int(header['NumberSamples']) \
+            if 'NumberSamples' in header else None
+        offset = 0 if self.filename != headerFile else headerSize
+        self._map(self.filename, NUMBER_FORMATS[self.numberFormat], offset)
+
+
+#.r3f header layout: fixed 16384 byte header, the data format block at 2048
+#and the channel and signal path block at 3072
+R3F_HEADER_SIZE = 16384
+R3F_DATA_FORMAT = struct.Struct('<iiiiiiiddd')
+R3F_DATA_FORMAT_OFFSET = 2048
+R3F_ADC_SCALE_OFFSET = 3072
+
+
+class R3fFile(StreamFile):
+    """
+    .r3f file written by formatted IF streaming: a 16384 byte header and
+    fixed size frames, each holding samplesInFrame int16 ADC samples
+    followed by a footer. samples is a (frames, samplesInFrame) strided
+    view straight onto the memmap that skips the footers, so it costs no
+    copy; read() joins frames only for the requested range.
+    The header's center frequency is that of the digitized IF, so it's
+    stored as ifCenterFreq and centerFreq stays None.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            rawHeader = f.read(R3F_HEADER_SIZE)
+        (dataType, frameOffset, frameSize, sampleOffset, samplesInFrame,
+            nonSampleOffset, nonSampleSize, self.ifCenterFreq, self.sampleRate,
+            self.bandwidth) = R3F_DATA_FORMAT.unpack_from(rawHeader,
+            R3F_DATA_FORMAT_OFFSET)
+        self.scale = struct.unpack_from('<d', rawHeader, R3F_ADC_SCALE_OFFSET)[0]
+        self.header = {'dataType': dataType, 'frameOffset': frameOffset,
+            'frameSize': frameSize, 'sampleOffset': sampleOffset,
+            'samplesInFrame': samplesInFrame, 'nonSampleOffset': nonSampleOffset,
+            'nonSampleSize': nonSampleSize}
+        self.samplesInFrame = samplesInFrame
+
+        numFrames = (os.path.getsize(filename) - frameOffset)//frameSize
+        self.numberSamples = numFrames*samplesInFrame
+        self._raw = np.memmap(filename, dtype=np.uint8, mode='r')
+        self.samples = np.ndarray((numFrames, samplesInFrame), dtype='<i2',
+            buffer=self._raw, offset=frameOffset + sampleOffset,
+            strides=(frameSize, 2))
+
+    def read(self, start, count, scaled=True):
+        #only the frames that hold [start, start + count) are touched
+        count = max(min(count, self.numberSamples - start), 0)
+        first = start//self.samplesInFrame
+        last = -(-(start + count)//self.samplesInFrame)
+        frames = self.samples[first:last].reshape(-1)
+        skip = start - first*self.samplesInFrame
+        data = frames[skip:skip + count]
+        if not scaled:
+            return data
+        return data.astype(np.float32)*np.float32(self.scale)
+
+    def close(self):
+        self.samples = None
+        self._raw = None
+
+
+def open_stream_file(filename):
+    #reader for any streamed file, picked by extension
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.tiq':
+        return TiqFile(filename)
+    if ext in ('.siq', '.siqh', '.siqd'):
+        return SiqFile(filename)
+    if ext == '.r3f':
+        return R3fFile(filename)
+    raise ValueError('Unknown streamed file type: {}'.format(ext))
@@ -0,0 +1,227 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Stream to Disk Monitor
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Watches an IQ or IF stream to disk from a background thread instead of a
+fixed time.sleep() loop. The polling interval starts short, backs off
+while nothing changes and shortens again as the expected end of the file
+gets close, so completion is seen within a few ms whether the file is
+50 ms or an hour long. Every poll samples the write status and, for IQ
+streaming, the file info (samples written and acqStatus) into a history,
+with the acqStatus flags counted by stream_status.StatusCounters.
+Completion is reported through wait(), done() and callbacks, so the next
+capture can be started from the callback.
+This file doesn't load RSA_API.dll. Pass in the library returned by
+cdll.LoadLibrary("RSA_API.dll") after search_connect() has connected.
+"""
+
+from ctypes import *
+import numpy as np
+import threading, time
+from ring_buffer import RingBuffer
+from stream_status import StatusCounters, StreamStatus, decode_status
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+class IQSTRMFILEINFO(Structure):
+    _fields_ = [('numberSamples', c_uint64),
+    ('sample0Timestamp', c_uint64),
+    ('triggerSampleIndex', c_uint64),
+    ('triggerTimestamp', c_uint64),
+    ('acqStatus', c_uint32),
+    ('filenames', c_wchar_p)]
+
+#one entry per poll in StreamMonitor.history
+#bytes is only known for IQ streaming with bytesPerSample given
+MONITOR_DTYPE = np.dtype([('time', np.float64),
+    ('writing', np.bool_),
+    ('numberSamples', np.uint64),
+    ('bytes', np.uint64),
+    ('acqStatus', np.uint32)])
+
+
+class StreamMonitor(object):
+    """
+    Monitors a stream to disk of kind 'iq' (IQSTREAM_GetDiskFileWriteStatus)
+    or 'if' (IFSTREAM_GetActiveStatus). Call start() right after
+    IQSTREAM_Start() or IFSTREAM_SetEnable().
+
+    The poll interval goes from minInterval up to maxInterval by backoff
+    each poll without news and drops back to minInterval when the status
+    changes. With durationSec (the file length) given, it's also kept
+    below a quarter of the time left, so the end is caught promptly.
+    bytesPerSample (2*4 for single and int32, 2*2 for int16) turns the IQ
+    sample count into bytes written.
+
+    The API isn't documented as safe to call from two threads at once, so
+    if another thread keeps using it while the monitor runs, pass a
+    threading.Lock as apiLock and hold the same lock around those calls.
+    Every poll is made under it.
+
+    counters counts the acqStatus flags as they come on, status holds the
+    flags of the last poll and events lists (time, StreamStatus) of the
+    flags that came on at each poll where any did. complete tells a
+    finished stream from a cancel().
+    """
+    def __init__(self, rsa, kind='iq', durationSec=None, bytesPerSample=None,
+        minInterval=0.002, maxInterval=0.25, backoff=1.5, capacity=65536,
+        apiLock=None):
+        if kind not in ('iq', 'if'):
+            raise ValueError('kind must be \'iq\' or \'if\', not {}'.format(kind))
+        self.rsa = rsa
+        self.kind = kind
+        self.durationSec = durationSec
+        self.bytesPerSample = bytesPerSample
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.backoff = backoff
+        self.history = RingBuffer(capacity, MONITOR_DTYPE)
+        self.fileInfo = IQSTRMFILEINFO()
+        self.apiLock = apiLock if apiLock is not None else threading.Lock()
+
+        self.polls = 0
+        self.counters = StatusCounters()
+        self.status = StreamStatus(0)
+        self.events = []
+        self.complete = False
+        self.startTime = None
+        self.endTime = None
+        self.error = None
+
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.startTime = time.time()
+        self._thread = threading.Thread(target=self._poll_loop)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        #stops monitoring without waiting for the file to finish,
+        #callbacks still run
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the stream finished (or timeout seconds), returns
+        done(). Raises RuntimeError if a status call failed.
+        """
+        #a timed wait keeps Ctrl-C working in Python 2
+        deadline = None if timeout is None else time.time() + timeout
+        while not self._done.is_set():
+            remaining = 0.5 if deadline is None else min(deadline - time.time(), 0.5)
+            if remaining <= 0:
+                break
+            self._done.wait(remaining)
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self._done.is_set()
+
+    def add_done_callback(self, callback):
+        """
+        callback(monitor) is called from the monitor thread as soon as the
+        stream finishes, or right away if it already has. Keep it short or
+        hand the work to another thread; from asyncio use
+        loop.call_soon_threadsafe().
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    @property
+    def elapsed(self):
+        if self.startTime is None:
+            return 0.0
+        end = self.endTime if self.endTime is not None else time.time()
+        return end - self.startTime
+
+    def throughput(self):
+        #bytes/s between consecutive polls, as (time, bytesPerSec) arrays
+        history = self.history.latest()
+        dt = np.diff(history['time'])
+        dBytes = np.diff(history['bytes'].astype(np.float64))
+        valid = dt > 0
+        return history['time'][1:][valid], dBytes[valid]/dt[valid]
+
+    def _poll(self):
+        #returns (finished, writing, numberSamples, acqStatus)
+        rsa = self.rsa
+        if self.kind == 'if':
+            active = c_bool(False)
+            ret = rsa.IFSTREAM_GetActiveStatus(byref(active))
+            self._check('IFSTREAM_GetActiveStatus', ret)
+            return not active.value, active.value, 0, 0
+
+        complete = c_bool(False)
+        writing = c_bool(False)
+        ret = rsa.IQSTREAM_GetDiskFileWriteStatus(byref(complete), byref(writing))
+        self._check('IQSTREAM_GetDiskFileWriteStatus', ret)
+        rsa.IQSTREAM_GetFileInfo(byref(self.fileInfo))
+        return (complete.value, writing.value, self.fileInfo.numberSamples,
+            self.fileInfo.acqStatus)
+
+    def _poll_loop(self):
+        interval = self.minInterval
+        last = None
+        try:
+            while not self._stopEvent.is_set():
+                now = time.time()
+                with self.apiLock:
+                    finished, writing, numberSamples, acqStatus = self._poll()
+                self.polls += 1
+                numBytes = numberSamples*(self.bytesPerSample or 0)
+                self.history.append((now, writing, numberSamples, numBytes,
+                    acqStatus))
+
+                new = self.counters.update(acqStatus)
+                self.status = decode_status(acqStatus)
+                if new:
+                    self.events.append((now, new))
+                if finished:
+                    self.complete = True
+                    break
+
+                #back off while nothing changes, start over when it does
+                if last is None or (writing, acqStatus) != last:
+                    interval = self.minInterval
+                else:
+                    interval = min(interval*self.backoff, self.maxInterval)
+                last = (writing, acqStatus)
+                if self.durationSec is not None:
+                    remaining = self.startTime + self.durationSec - now
+                    interval = max(min(interval, remaining/4.0), self.minInterval)
+                self._stopEvent.wait(interval)
+        except RuntimeError as e:
+            self.error = str(e)
+        self.endTime = time.time()
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def _check(self, function, ret):
+        if ret != 0:
+            raise RuntimeError('Error in {}: {}'.format(function, ret))
@@ -0,0 +1,209 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: IQ Streaming Status
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Decoding of the IQ streaming acqStatus word. Bits 0-5 describe the
+current block and bits 16-21 are the same conditions held since the
+stream started. decode_status() turns either into a StreamStatus, an int
+with named flags. StatusCounters counts how often each condition came on
+during a session, and TelemetryLog keeps one compact record per file
+segment (samples, timestamps, status, counts, bytes written) so data loss
+can be lined up against disk throughput.
+This file doesn't load RSA_API.dll, it only works on status values.
+"""
+
+import numpy as np
+import time
+from ring_buffer import RingBuffer
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+class StreamStatus(int):
+    """
+    acqStatus flags as an int: test with status & INPUT_OVERFLOW or
+    INPUT_OVERFLOW in status, list them with names(). str() gives one
+    line per flag, 'No error.' when none are set.
+    """
+    def __contains__(self, flag):
+        return bool(self & flag)
+
+    def __or__(self, other):
+        return StreamStatus(int(self) | other)
+
+    def __and__(self, other):
+        return StreamStatus(int(self) & other)
+
+    def names(self):
+        return [name for name, flag in FLAGS if self & flag]
+
+    def __repr__(self):
+        return 'StreamStatus({})'.format('|'.join(self.names()) or '0')
+
+    def __str__(self):
+        if not self:
+            return 'No error.'
+        return '\n'.join(MESSAGES[name] for name in self.names())
+
+
+OVERRANGE = StreamStatus(0x1)
+DISCONTINUITY = StreamStatus(0x2)
+INPUT_BUFFER_75 = StreamStatus(0x4)
+INPUT_OVERFLOW = StreamStatus(0x8)
+OUTPUT_BUFFER_75 = StreamStatus(0x10)
+OUTPUT_OVERFLOW = StreamStatus(0x20)
+ALL_FLAGS = 0x3f
+#the sticky copy of a flag is the same bit shifted up by STICKY_SHIFT
+STICKY_SHIFT = 16
+
+#(name, flag) in bit order, the names are also the counter names
+FLAGS = [('overrange', OVERRANGE),
+    ('discontinuity', DISCONTINUITY),
+    ('inputBuffer75', INPUT_BUFFER_75),
+    ('inputOverflow', INPUT_OVERFLOW),
+    ('outputBuffer75', OUTPUT_BUFFER_75),
+    ('outputOverflow', OUTPUT_OVERFLOW)]
+
+MESSAGES = {'overrange': 'Input overrange.',
+    'discontinuity': 'USB data stream discontinuity.',
+    'inputBuffer75': 'Input buffer > 75% full.',
+    'inputOverflow': 'Input buffer overflow. IQStream processing too slow, data loss has occurred.',
+    'outputBuffer75': 'Output buffer > 75% full.',
+    'outputOverflow': 'Output buffer overflow. File writing too slow, data loss has occurred.'}
+
+#flags that mean samples were lost
+DATA_LOSS = DISCONTINUITY | INPUT_OVERFLOW | OUTPUT_OVERFLOW
+
+
+def decode_status(acqStatus, sticky=None):
+    """
+    StreamStatus of an acqStatus word: the current block's flags with
+    sticky=False, the flags held since the start with sticky=True, or
+    either (the default).
+    """
+    current = acqStatus & ALL_FLAGS
+    held = (acqStatus >> STICKY_SHIFT) & ALL_FLAGS
+    if sticky is None:
+        return StreamStatus(current | held)
+    return StreamStatus(held if sticky else current)
+
+
+class StatusCounters(object):
+    """
+    Number of times each flag came on over a session, fed one acqStatus
+    word at a time (per block from IQSTREAM_GetIQData() or per poll of
+    the file info). A flag that stays on counts once; a sticky bit that
+    turned on between updates without the current bit being seen counts
+    too. counts maps the FLAGS names to their counts, seen is every flag
+    that was ever set.
+    """
+    def __init__(self):
+        self.clear()
+
+    def __getitem__(self, name):
+        return self.counts[name]
+
+    def update(self, acqStatus):
+        #returns the flags that came on with this update
+        current = acqStatus & ALL_FLAGS
+        held = (acqStatus >> STICKY_SHIFT) & ALL_FLAGS
+        new = (current & ~self._current) | (held & ~self._held & ~current)
+        self._current = current
+        self._held = held
+        self.updates += 1
+        if new:
+            for name, flag in FLAGS:
+                if new & flag:
+                    self.counts[name] += 1
+            self.seen |= new
+        return StreamStatus(new)
+
+    def data_lost(self):
+        return bool(self.seen & DATA_LOSS)
+
+    def clear(self):
+        self.counts = dict((name, 0) for name, flag in FLAGS)
+        self.seen = StreamStatus(0)
+        self.updates = 0
+        self._current = 0
+        self._held = 0
+
+    def __str__(self):
+        return ', '.join('{}: {}'.format(name, self.counts[name])
+            for name, flag in FLAGS)
+
+
+#one entry per file segment in TelemetryLog
+TELEMETRY_DTYPE = np.dtype([('time', np.float64),
+    ('elapsed', np.float32),
+    ('numberSamples', np.uint64),
+    ('bytes', np.uint64),
+    ('sample0Timestamp', np.uint64),
+    ('triggerSampleIndex', np.uint64),
+    ('triggerTimestamp', np.uint64),
+    ('acqStatus', np.uint32)] +
+    [(name, np.uint16) for name, flag in FLAGS])
+
+
+class TelemetryLog(object):
+    """
+    The last capacity file segments as TELEMETRY_DTYPE records, also
+    appended to filename (if given) as raw records of
+    TELEMETRY_DTYPE.itemsize bytes; read them back with load_telemetry().
+    """
+    def __init__(self, filename=None, capacity=4096):
+        self.filename = filename
+        self.records = RingBuffer(capacity, TELEMETRY_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def append(self, fileInfo, elapsed, bytesPerSample=0, counters=None,
+        now=None):
+        """
+        Logs one segment from its IQSTRMFILEINFO, the time it took to
+        write and the StatusCounters of the segment (the flags of
+        fileInfo.acqStatus if not given). Returns the record.
+        """
+        if counters is None:
+            counters = StatusCounters()
+            counters.update(fileInfo.acqStatus)
+        record = np.zeros(1, dtype=TELEMETRY_DTYPE)
+        record['time'] = time.time() if now is None else now
+        record['elapsed'] = elapsed
+        record['numberSamples'] = fileInfo.numberSamples
+        record['bytes'] = fileInfo.numberSamples*bytesPerSample
+        record['sample0Timestamp'] = fileInfo.sample0Timestamp
+        record['triggerSampleIndex'] = fileInfo.triggerSampleIndex
+        record['triggerTimestamp'] = fileInfo.triggerTimestamp
+        record['acqStatus'] = fileInfo.acqStatus
+        for name, flag in FLAGS:
+            record[name] = counters[name]
+        self.records.append(record[0])
+        if self.filename is not None:
+            with open(self.filename, 'ab') as f:
+                record.tofile(f)
+        return record[0]
+
+    def latest(self, n=None):
+        return self.records.latest(n)
+
+    def data_loss(self):
+        #the logged segments that lost samples
+        records = self.records.latest()
+        lost = np.zeros(len(records), dtype=bool)
+        for name, flag in FLAGS:
+            if flag & DATA_LOSS:
+                lost |= records[name] > 0
+        return records[lost]
+
+
+def load_telemetry(filename):
+    #every record written by TelemetryLog, throughput is bytes/elapsed
+    return np.fromfile(filename, dtype=TELEMETRY_DTYPE)
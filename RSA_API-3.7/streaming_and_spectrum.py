@@ -19,7 +19,9 @@ if the spectrum span is set to 40 MHz or less.
 from ctypes import *
 import numpy as np
 import matplotlib.pyplot as plt
-import time, os
+import os, threading
+from settings_cache import frequency_axis
+from stream_monitor import StreamMonitor
 
 """
 ################################################################
@@ -103,15 +105,12 @@ def main():
 	bwHz_act = c_double(0)
 	sRate = c_double(0)
 	durationMsec = 1000
-	waitTime = 0.1
 	fileDirectory = 'C:\SignalVu-PC Files\!garbage'
 	fileName = 'stream_test'
 	streamingMode = 1
-	streaming = True
 
 	specSet = Spectrum_Settings()
 	specEnable = c_bool(True)
-	writing = c_bool(True)
 	ready = c_bool(False)
 	timeoutMsec = 100
 
@@ -166,9 +165,7 @@ def main():
 	outTracePoints = c_int()
 
 	#generate frequency array for plotting the spectrum
-	freq = np.arange(specSet.actualStartFreq, 
-		specSet.actualStartFreq + specSet.actualFreqStepSize*specSet.traceLength, 
-		specSet.actualFreqStepSize)
+	freq = frequency_axis(specSet)
 
 	#prepare plot window for periodic updates
 	specPlot, = plt.plot([],[])
@@ -190,14 +187,21 @@ def main():
 	print('Beginning streaming.')
 	rsa.DEVICE_Run()
 
-	start = time.clock()
 	rsa.IFSTREAM_SetEnable(c_bool(True))
-	while streaming == True:
-		rsa.SPECTRUM_AcquireTrace()
+	#the monitor thread tracks the file, the loop only draws spectra
+	#both threads use the API, so every call is made holding apiLock
+	apiLock = threading.Lock()
+	monitor = StreamMonitor(rsa, 'if', durationMsec/1e3, 
+		apiLock=apiLock).start()
+	while not monitor.done():
+		with apiLock:
+			rsa.SPECTRUM_AcquireTrace()
 		while ready.value == False:
-			rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
-		rsa.SPECTRUM_GetTrace(c_int(0), specSet.traceLength, 
-			byref(traceData), byref(outTracePoints))
+			with apiLock:
+				rsa.SPECTRUM_WaitForDataReady(timeoutMsec, byref(ready))
+		with apiLock:
+			rsa.SPECTRUM_GetTrace(c_int(0), specSet.traceLength, 
+				byref(traceData), byref(outTracePoints))
 
 		#convert trace data from a ctypes array to a numpy array
 		trace = np.ctypeslib.as_array(traceData)
@@ -207,16 +211,12 @@ def main():
 		specPlot.set_xdata(freq)
 		specPlot.set_ydata(trace)
 		plt.draw()
-
-		time.sleep(waitTime)
-		rsa.IFSTREAM_GetActiveStatus(byref(writing))
-		streaming = writing.value
-	end = time.clock()
+	monitor.wait()
 
 	rsa.DEVICE_Stop()
 	plt.close()
 	print('Streaming finished.')
-	print('Elapsed time: {} seconds.\n'.format(end-start))
+	print('Elapsed time: {} seconds.\n'.format(monitor.elapsed))
 	print('Disconnecting.')
 	rsa.DEVICE_Disconnect()
 
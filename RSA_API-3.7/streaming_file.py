@@ -13,7 +13,10 @@ Anaconda includes NumPy and MatPlotLib
 """
 
 from ctypes import *
-import time, os
+import os
+from stream_file_readers import open_stream_file
+from stream_monitor import IQSTRMFILEINFO, StreamMonitor
+from stream_status import TelemetryLog, decode_status
 
 """
 ################################################################
@@ -25,29 +28,6 @@ os.chdir("C:\\Tektronix\\RSA_API\\lib\\x64")
 rsa = cdll.LoadLibrary("RSA_API.dll")
 
 """#################CLASSES AND FUNCTIONS#################"""
-class IQSTRMFILEINFO(Structure):
-   _fields_ = [('numberSamples', c_uint64), 
-   ('sample0Timestamp', c_uint64),
-   ('triggerSampleIndex', c_uint64), 
-   ('triggerTimestamp', c_uint64),
-   ('acqStatus', c_uint32), 
-   ('filenames', c_wchar_p)]
-
-def iqstream_status_parser(acqStatus):
-	#this function parses the IQ streaming status variable
-	if acqStatus == 0:
-		print('\nNo error.\n')
-	if (bool(acqStatus & 0x10000)):	#mask bit 16
-		print('\nInput overrange.\n')
-	if (bool(acqStatus & 0x40000)):	#mask bit 18
-		print('\nInput buffer > 75{} full.\n'.format('%'))
-	if (bool(acqStatus & 0x80000)):	#mask bit 19
-		print('\nInput buffer overflow. IQStream processing too slow, data loss has occurred.\n')
-	if (bool(acqStatus & 0x100000)):	#mask bit 20
-		print('\nOutput buffer > 75{} full.\n'.format('%'))
-	if (bool(acqStatus & 0x200000)):	#mask bit 21
-		print('Output buffer overflow. File writing too slow, data loss has occurred.\n')
-
 def suf_ext_parser(streamtype, streamingMode, dest, suffixCtl):
 	#this function handles printing the location of the saved file
 	if streamtype == 1:
@@ -78,7 +58,6 @@ def streaming_setup_fixed():
 	#this function sets up IQ streaming without command line user input
 	bwHz_req = c_double(5e6)
 	durationMsec = 1000
-	waitTime = durationMsec/1e3/10
 	fileDirectory = 'C:\SignalVu-PC Files\!garbage'
 	fileName = 'stream_test'
 	filenameBase = fileDirectory + '\\' + fileName
@@ -103,7 +82,7 @@ def streaming_setup_fixed():
 	rsa.SetStreamADCToDiskMode(c_int(streamingMode))
 	rsa.SetStreamADCToDiskMaxFileCount(c_int(1))
 
-	return waitTime, dest, dtype, suffixCtl, fileDirectory, fileName, streamingMode
+	return durationMsec, dest, dtype, suffixCtl, fileDirectory, fileName, streamingMode
 
 def search_connect():
     #search/connect variables
@@ -164,12 +143,6 @@ def main():
 	dest = suffixCtl = streamingMode = streamtype = -1024
 
 	#stream control variables
-	#streaming status boolean variable
-	complete = c_bool(False)
-	#write status boolean variable (always true if non-triggered acquisition)
-	writing = c_bool(False)
-	#bool used for streaming IQ control
-	streaming = True
 	iqstream_info = IQSTRMFILEINFO()
 
 
@@ -188,7 +161,7 @@ def main():
 		streamtype = input('Type 1 for IF streaming or 2 for IQ streaming.\n> ')
 
 	#optional static setup functions for testing	
-	#waitTime, dest, dtype, suffixCtl, fileDirectory, fileName, streamingMode = streaming_setup_fixed()
+	#durationMsec, dest, dtype, suffixCtl, fileDirectory, fileName, streamingMode = streaming_setup_fixed()
 
 
 	if streamtype == 1:
@@ -211,7 +184,6 @@ def main():
 		#file duration
 		durationMsec = input('Enter file duration in milliseconds.\n> ')
 		rsa.IFSTREAM_SetDiskFileLength(c_int(durationMsec))
-		waitTime = durationMsec/1e3/10
 
 		#streaming mode
 		while (streamingMode < 0) or (streamingMode > 1):
@@ -269,7 +241,6 @@ def main():
 		while durationMsec <= 0:
 			durationMsec = input('Enter file duration in milliseconds.\n> ')
 		rsa.IQSTREAM_SetDiskFileLength(c_long(durationMsec))
-		waitTime = durationMsec/1e3/10
 
 
 	"""#################STREAMING#################"""
@@ -286,33 +257,44 @@ def main():
 	print('Beginning streaming.')
 	rsa.DEVICE_Run()
 	if streamtype == 1:
-		start = time.clock()
-		rsa.SetStreamADCToDiskEnabled(c_bool(True))
-		while streaming == True:
-			time.sleep(waitTime)
-			rsa.GetStreamADCToDiskActive(byref(writing))
-			streaming = writing.value
-		end = time.clock()
+		rsa.IFSTREAM_SetEnable(c_bool(True))
+		monitor = StreamMonitor(rsa, 'if', durationMsec/1e3).start()
 	elif streamtype == 2:
-		start = time.clock()
 		rsa.IQSTREAM_Start()
-		while streaming == True:
-			time.sleep(waitTime)
-			rsa.IQSTREAM_GetDiskFileWriteStatus(byref(complete), byref(writing))
-			if complete.value == True:
-				streaming = False
-		end = time.clock()
+		#dtype: 0 = single, 1 = int32, 2 = int16
+		monitor = StreamMonitor(rsa, 'iq', durationMsec/1e3, 
+			2*[4, 4, 2][dtype]).start()
+	#the monitor polls the write status until the file is done
+	monitor.wait()
+	if streamtype == 2:
 		rsa.IQSTREAM_Stop()
 		rsa.IQSTREAM_GetFileInfo(byref(iqstream_info))
-		iqstream_status_parser(iqstream_info.acqStatus)
+		#the final sticky bits catch anything that happened after the last poll
+		monitor.counters.update(iqstream_info.acqStatus)
+		print('\n{}\n'.format(decode_status(iqstream_info.acqStatus, sticky=True)))
+
+		#one record per file, appended next to the files
+		telemetry = TelemetryLog(os.path.join(fileDirectory, 
+			fileName + '_telemetry.bin'))
+		telemetry.append(iqstream_info, monitor.elapsed, 2*[4, 4, 2][dtype], 
+			monitor.counters)
 
 	rsa.DEVICE_Stop()
 
-	print('Elapsed time: {} seconds.\n'.format(end-start))
+	print('Elapsed time: {} seconds.'.format(monitor.elapsed))
+	print('Status polls: {}, {}\n'.format(monitor.polls, monitor.counters))
 	suf, ext = suf_ext_parser(streamtype, streamingMode, dest, suffixCtl)
 	print('File(s) saved at ' + str(fileDirectory) + '\\' + str(fileName) +
 		suf + ext)
 
+	#read the IQ file back, only its header is read until samples are used
+	if streamtype == 2 and suf == '':
+		iqFile = open_stream_file(os.path.join(fileDirectory, fileName) + 
+			ext.split('/')[0])
+		print('{} IQ pairs at {} S/s, first samples: {}'.format(len(iqFile), 
+			iqFile.sampleRate, iqFile.read(0, 4)))
+		iqFile.close()
+
 	print('Disconnecting.')
 	rsa.DEVICE_Disconnect()
 
@@ -0,0 +1,110 @@
+"""
+Checks of pulse_measurements.py on synthetic IQ records with known pulse
+widths, PRI, power and edge times. Run with pytest from this directory.
+"""
+
+import numpy as np
+from pulse_measurements import (iq_to_dbm, iq_to_mw, find_pulse_edges,
+    find_pulse_edges_batch, measure_pulses)
+
+
+SAMPLE_RATE = 1e6
+FLOOR = 1e-6        #volts between pulses, keeps the log finite
+
+
+def pulse_train(length, starts, width, amplitude=1.0, ramp=0):
+    #I record of rectangular (or trapezoidal, with ramp samples of linear
+    #voltage rise and fall) pulses, Q is zero
+    I = np.zeros(length) + FLOOR
+    shape = np.ones(width)*amplitude
+    if ramp:
+        edge = np.arange(1, ramp + 1)/float(ramp)*amplitude
+        shape[:ramp] = edge
+        shape[-ramp:] = edge[::-1]
+    for start in starts:
+        stop = min(start + width, length)
+        I[start:stop] = np.maximum(shape[:stop - start], FLOOR)
+    return I, np.zeros(length)
+
+
+def test_power_conversions():
+    #1 V peak into 50 ohms is 10 mW, 10 dBm
+    assert np.allclose(iq_to_mw(1.0, 0.0), 10.0)
+    assert np.allclose(iq_to_dbm(0.6, 0.8), 10.0)
+
+
+def test_find_pulse_edges_known_widths():
+    I, Q = pulse_train(1000, [100, 350, 600], 100)
+    rising, falling, widths = find_pulse_edges(iq_to_dbm(I, Q), thresh=10)
+    assert list(rising) == [100, 350, 600]
+    assert list(falling) == [200, 450, 700]
+    assert list(widths) == [100, 100, 100]
+
+
+def test_find_pulse_edges_skips_incomplete_pulses():
+    #on at the start and still on at the end of the record
+    I, Q = pulse_train(1000, [0, 400, 950], 100)
+    rising, falling, widths = find_pulse_edges(iq_to_dbm(I, Q), thresh=10)
+    assert list(rising) == [400]
+    assert list(falling) == [500]
+
+
+def test_find_pulse_edges_hysteresis_ignores_chatter():
+    #dips to within the hysteresis band don't split the pulse
+    dbm = np.zeros(300) - 60.0
+    dbm[100:200] = 0.0
+    dbm[150:153] = -10.2
+    rising, falling, widths = find_pulse_edges(dbm, thresh=10, hysteresis=1.0)
+    assert list(rising) == [100]
+    assert list(widths) == [100]
+    rising, falling, widths = find_pulse_edges(dbm, thresh=10, hysteresis=0.1)
+    assert list(rising) == [100, 153]
+
+
+def test_find_pulse_edges_batch_rows():
+    records = np.vstack([iq_to_dbm(*pulse_train(500, [50], 20)),
+        iq_to_dbm(*pulse_train(500, [100, 300], 40))])
+    rows, rising, falling = find_pulse_edges_batch(records, thresh=10)
+    assert list(rows) == [0, 1, 1]
+    assert list(rising) == [50, 100, 300]
+    assert list(falling - rising) == [20, 40, 40]
+
+
+def test_measure_pulses_width_pri_duty_cycle_power():
+    I, Q = pulse_train(2000, [100, 350, 600, 850], 100, amplitude=0.5)
+    pulses = measure_pulses(I, Q, SAMPLE_RATE)
+    assert len(pulses) == 4
+    assert np.allclose(pulses.width, 100/SAMPLE_RATE)
+    assert np.allclose(pulses.pri[:-1], 250/SAMPLE_RATE)
+    assert np.isnan(pulses.pri[-1])
+    assert np.allclose(pulses.dutyCycle[:-1], 0.4)
+    #0.5 V peak is 2.5 mW
+    assert np.allclose(pulses.peakPower, 10*np.log10(2.5))
+    assert np.allclose(pulses.avgPower, 10*np.log10(2.5))
+    assert np.allclose(pulses.droop, 0)
+
+
+def test_measure_pulses_rise_and_fall_time():
+    #a linear 20 sample voltage ramp goes from 10% to 90% in 16 samples
+    I, Q = pulse_train(1000, [200, 500], 150, ramp=20)
+    pulses = measure_pulses(I, Q, SAMPLE_RATE)
+    assert len(pulses) == 2
+    assert np.allclose(pulses.riseTime, 16/SAMPLE_RATE, atol=0.5/SAMPLE_RATE)
+    assert np.allclose(pulses.fallTime, 16/SAMPLE_RATE, atol=0.5/SAMPLE_RATE)
+
+
+def test_measure_pulses_stacked_records():
+    I1, Q1 = pulse_train(1000, [100, 400], 50)
+    I2, Q2 = pulse_train(1000, [200], 80)
+    pulses = measure_pulses(np.vstack([I1, I2]), np.vstack([Q1, Q2]),
+        SAMPLE_RATE)
+    assert list(pulses.record) == [0, 0, 1]
+    assert np.allclose(pulses.width*SAMPLE_RATE, [50, 50, 80])
+    #PRI never spans two records
+    assert np.allclose(pulses.pri[0]*SAMPLE_RATE, 300)
+    assert np.isnan(pulses.pri[1]) and np.isnan(pulses.pri[2])
+
+
+def test_measure_pulses_no_pulses():
+    I, Q = pulse_train(500, [], 10)
+    assert len(measure_pulses(I, Q, SAMPLE_RATE)) == 0
@@ -0,0 +1,129 @@
+"""
+Checks of spectrum_measurements.py on synthetic spectrum traces with known
+occupied and x dB bandwidths and peaks. Run with pytest from this directory.
+"""
+
+import numpy as np
+from spectrum_measurements import occupied_bandwidth, xdb_bandwidth, find_peaks
+
+
+class Settings(object):
+    #the Spectrum_Settings fields the measurements use
+    span = 40e6
+    actualRBW = 100e3
+    traceLength = 801
+
+FREQ = np.linspace(-20e6, 20e6, Settings.traceLength)
+DF = FREQ[1] - FREQ[0]
+
+
+def flat_top(center, numBins, level=0.0, floor=-150.0):
+    #numBins bins of equal power around center bin, floor everywhere else
+    trace = np.zeros(Settings.traceLength) + floor
+    trace[center - numBins//2:center - numBins//2 + numBins] = level
+    return trace
+
+
+def triangle(center, slope, floor=-100.0):
+    #peak of 0 dBm falling slope dB per bin on both sides
+    trace = -slope*np.abs(np.arange(Settings.traceLength) - center)
+    return np.maximum(trace, floor)
+
+
+def parabolas(peaks, curvature=2.0, floor=-80.0):
+    #parabolic peaks (point, power), the point can fall between bins
+    x = np.arange(Settings.traceLength)
+    trace = np.zeros(Settings.traceLength) + floor
+    for point, power in peaks:
+        trace = np.maximum(trace, power - curvature*(x - point)**2)
+    return trace
+
+
+def test_obw_flat_top():
+    #201 equal bins cover 201*DF, 99% of the power is in 0.99 of that
+    f1, f2, obw = occupied_bandwidth(flat_top(400, 201), FREQ, Settings())
+    assert np.allclose(obw, 0.99*201*DF)
+    assert np.allclose([f1, f2], [-0.99*201*DF/2, 0.99*201*DF/2])
+
+
+def test_obw_percentage_and_level():
+    #the result depends on the shape only, not the absolute level
+    for level in (-40.0, 0.0, 20.0):
+        f1, f2, obw = occupied_bandwidth(flat_top(400, 101, level), FREQ,
+            Settings(), obwpcnt=0.5)
+        assert np.allclose(obw, 0.5*101*DF)
+
+
+def test_obw_rows():
+    traces = np.vstack([flat_top(400, 201), flat_top(300, 51)])
+    f1, f2, obw = occupied_bandwidth(traces, FREQ, Settings())
+    assert obw.shape == (2,)
+    assert np.allclose(obw, [0.99*201*DF, 0.99*51*DF])
+    assert np.allclose((f1 + f2)/2, [FREQ[400], FREQ[300]])
+
+
+def test_xdb_bandwidth_on_bins():
+    #1 dB per bin is 26 dB down 26 bins either side of the peak
+    f1, f2, bw = xdb_bandwidth(triangle(400, 1.0), FREQ)
+    assert np.allclose(bw, 52*DF)
+    assert np.allclose([f1, f2], [FREQ[374], FREQ[426]])
+
+
+def test_xdb_bandwidth_interpolated():
+    #0.8 dB per bin is 26 dB down 32.5 bins either side
+    f1, f2, bw = xdb_bandwidth(triangle(400, 0.8), FREQ)
+    assert np.allclose(bw, 65*DF)
+    f1, f2, bw = xdb_bandwidth(triangle(400, 0.8), FREQ, xdb=3.0)
+    assert np.allclose(bw, 7.5*DF)
+
+
+def test_xdb_bandwidth_edge_of_trace():
+    #never 26 dB down left of a peak 10 bins from the start
+    f1, f2, bw = xdb_bandwidth(triangle(10, 1.0), FREQ)
+    assert f1 == FREQ[0]
+    assert np.allclose(f2, FREQ[36])
+
+
+def test_xdb_bandwidth_rows():
+    traces = np.vstack([triangle(400, 1.0), triangle(200, 2.0)])
+    f1, f2, bw = xdb_bandwidth(traces, FREQ)
+    assert np.allclose(bw, [52*DF, 26*DF])
+
+
+def test_find_peaks_fields_by_attribute():
+    peaks = find_peaks(parabolas([(100.3, -10.0), (500.0, -20.0)]), FREQ)
+    assert len(peaks) == 2
+    assert list(peaks.row) == [0, 0]
+    assert list(peaks.index) == [100, 500]
+    #the parabola through three points on a parabola finds its vertex
+    assert np.allclose(peaks.freq, [FREQ[0] + 100.3*DF, FREQ[500]])
+    assert np.allclose(peaks.power, [-10.0, -20.0])
+    assert peaks[0].power == peaks.power[0]
+
+
+def test_find_peaks_threshold_and_count():
+    trace = parabolas([(100, -10.0), (300, -30.0), (500, -20.0), (700, -40.0)])
+    peaks = find_peaks(trace, FREQ, threshold=-35)
+    assert list(peaks.index) == [100, 500, 300]
+    peaks = find_peaks(trace, FREQ, numPeaks=2)
+    assert list(peaks.index) == [100, 500]
+
+
+def test_find_peaks_excursion():
+    #a -13 dBm shoulder 7 dB above the valley next to a -10 dBm peak
+    trace = np.zeros(Settings.traceLength) - 80.0
+    trace[48:57] = [-30, -20, -10, -20, -16, -13, -16, -30, -40]
+    assert list(find_peaks(trace, FREQ, excursion=6).index) == [50, 53]
+    assert list(find_peaks(trace, FREQ, excursion=8).index) == [50]
+
+
+def test_find_peaks_rows():
+    traces = np.vstack([parabolas([(100, -10.0), (600, -5.0)]),
+        parabolas([(250, -30.0)]),
+        parabolas([])])
+    peaks = find_peaks(traces, FREQ)
+    assert list(peaks.row) == [0, 0, 1]
+    assert list(peaks.index) == [600, 100, 250]
+    assert np.allclose(peaks.power, [-5.0, -10.0, -30.0])
+    #one trace's peaks
+    assert list(peaks[peaks.row == 1].index) == [250]
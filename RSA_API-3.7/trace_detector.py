@@ -0,0 +1,108 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Trace Averaging and Hold
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Trace averaging and max/min hold for spectrum traces in dBm.
+All the work is done in place in buffers allocated up front, so it can
+run on every trace at full trace rate.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+#trace detector modes
+#linear: average of power in mW, running mean up to count traces then
+#    exponential with weight 1/count (like an analyzer's average count)
+#log: same as linear, but averaging the dBm values
+#exponential: exponential average of power in mW with weight alpha
+#maxhold/minhold: largest/smallest value seen in each bin
+#window: average of power in mW over the last count traces (over every trace
+#    so far until count traces have arrived)
+DETECTOR_MODES = ('linear', 'log', 'exponential', 'maxhold', 'minhold',
+    'window')
+
+
+class TraceDetector(object):
+    """
+    Combines a stream of dBm traces of traceLength points into one
+    detected trace. Call update() with every new trace; it returns the
+    detected trace in dBm as a float32 array that is reused by the next
+    update(). reset() starts over, e.g. after a settings change.
+    """
+    def __init__(self, traceLength, mode='linear', count=10, alpha=0.1):
+        if mode not in DETECTOR_MODES:
+            raise ValueError('Unknown detector mode: {}'.format(mode))
+        self.mode = mode
+        self.count = count
+        self.alpha = alpha
+        self.linear = mode in ('linear', 'exponential', 'window')
+
+        self._acc = np.zeros(traceLength, dtype=np.float64)
+        self._scratch = np.zeros(traceLength, dtype=np.float64)
+        self._out = np.zeros(traceLength, dtype=np.float32)
+        if mode == 'window':
+            self._window = np.zeros((count, traceLength), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        #number of traces since the last reset
+        self.traces = 0
+
+    def update(self, trace):
+        scratch = self._scratch
+        acc = self._acc
+
+        #convert to mW in the scratch buffer, or just copy the dBm values
+        if self.linear:
+            np.multiply(trace, 0.1, out=scratch)
+            np.power(10.0, scratch, out=scratch)
+        else:
+            scratch[:] = trace
+
+        self.traces += 1
+        if self.mode == 'window':
+            #the window is filled in arrival order, then the oldest trace
+            #is overwritten. The sum is taken again every time instead of
+            #kept running: subtracting a strong trace out of a running sum
+            #leaves a residue that swamps weak ones
+            numTraces = min(self.traces, self.count)
+            self._window[(self.traces - 1) % self.count] = scratch
+            np.sum(self._window[:numTraces], axis=0, out=acc)
+        elif self.traces == 1:
+            acc[:] = scratch
+        elif self.mode in ('linear', 'log'):
+            #acc += (new - acc)/n
+            weight = 1.0/min(self.traces, self.count)
+            np.subtract(scratch, acc, out=scratch)
+            scratch *= weight
+            acc += scratch
+        elif self.mode == 'exponential':
+            np.subtract(scratch, acc, out=scratch)
+            scratch *= self.alpha
+            acc += scratch
+        elif self.mode == 'maxhold':
+            np.maximum(acc, scratch, out=acc)
+        elif self.mode == 'minhold':
+            np.minimum(acc, scratch, out=acc)
+
+        if self.mode == 'window':
+            np.multiply(acc, 1.0/min(self.traces, self.count), out=scratch)
+            self._to_dbm(scratch)
+        elif self.linear:
+            self._to_dbm(acc)
+        else:
+            self._out[:] = acc
+        return self._out
+
+    def _to_dbm(self, mW):
+        np.log10(mW, out=self._out)
+        self._out *= 10
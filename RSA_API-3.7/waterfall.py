@@ -0,0 +1,78 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Waterfall History
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+
+Rolling waterfall of the last N spectrum traces or DPXogram lines with
+their timestamps, for long running occupancy displays. Rows go into
+fixed-size ring buffers in O(1), and the newest rows are always
+available oldest first as views, without reallocating or concatenating.
+This file doesn't load RSA_API.dll, it only works on NumPy arrays.
+"""
+
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+class Waterfall(object):
+    """
+    The last height rows of width points, with a timestamp and a scale
+    factor per row. Use float32 for spectrum traces in dBm, or int16 for
+    raw DPXogram lines with their dataSF as the scale, which stores them
+    at half the size. Timestamps are in whatever unit they're given in
+    (Spectrum_TraceInfo.timestamp, sogramBitmapTimestampArray...).
+    """
+    def __init__(self, height, width, dtype=np.float32):
+        self.rows = RingBuffer(height, dtype, rowShape=(width,))
+        self.timestamps = RingBuffer(height, np.float64)
+        self.scales = RingBuffer(height, np.float32)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, row, timestamp, scale=1.0):
+        self.rows.append(row)
+        self.timestamps.append(timestamp)
+        self.scales.append(scale)
+
+    def extend(self, rows, timestamps, scales=1.0):
+        #adds several rows at once, e.g. a batch of DPXogram lines
+        rows = np.asarray(rows)
+        self.rows.extend(rows)
+        self.timestamps.extend(np.zeros(len(rows)) + timestamps)
+        self.scales.extend(np.zeros(len(rows), dtype=np.float32) + scales)
+
+    def latest(self, n=None):
+        """
+        (rows, timestamps) of the newest n rows (all by default), oldest
+        first, as views that are only valid until the next append(). The
+        rows are the stored values, without the scale applied.
+        """
+        return self.rows.latest(n), self.timestamps.latest(n)
+
+    def since(self, timestamp):
+        #(rows, timestamps) views of the rows at or after timestamp
+        timestamps = self.timestamps.latest()
+        n = len(timestamps) - np.searchsorted(timestamps, timestamp)
+        return self.latest(n)
+
+    def scaled(self, n=None, out=None):
+        #newest n rows with their scale applied, as float32 (into out)
+        rows = self.rows.latest(n)
+        scales = self.scales.latest(n)
+        if out is None:
+            out = np.empty(rows.shape, dtype=np.float32)
+        np.multiply(rows, scales[:, np.newaxis], out=out)
+        return out
+
+    def clear(self):
+        self.rows.clear()
+        self.timestamps.clear()
+        self.scales.clear()
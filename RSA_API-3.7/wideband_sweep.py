@@ -0,0 +1,137 @@
+"""
+#### NEW RSA_API VERSION ####
+Tektronix RSA306 API V2: Wideband Stepped Sweep
+Date created: 10/26
+Windows 7 64-bit
+RSA API version 3.7.0561
+Python 2.7.8 64-bit (Anaconda 2.1.0)
+NumPy 1.9.0, MatPlotLib 1.4.0
+To get Anaconda: http://continuum.io/downloads
+Anaconda includes NumPy and MatPlotLib
+"""
+
+from ctypes import *
+import numpy as np
+import matplotlib.pyplot as plt
+import os
+from spectrum_sweep import SpectrumSweep
+from instrument_state import InstrumentState
+
+"""
+################################################################
+C:\Tektronix\RSA_API\lib\x64 needs to be added to the 
+PATH system environment variable
+################################################################
+"""
+os.chdir("C:\\Tektronix\\RSA_API\\lib\\x64")
+rsa = cdll.LoadLibrary("RSA_API.dll")
+
+
+"""#################CLASSES AND FUNCTIONS#################"""
+def search_connect():
+    #search/connect variables
+    numFound = c_int(0)
+    intArray = c_int*10
+    deviceIDs = intArray()
+    #this is absolutely asinine, but it works
+    deviceSerial = c_char_p('longer than the longest serial number')
+    deviceType = c_char_p('longer than the longest device type')
+    apiVersion = c_char_p('api')
+
+    #get API version
+    rsa.DEVICE_GetAPIVersion(apiVersion)
+    print('API Version {}'.format(apiVersion.value))
+
+    #search
+    ret = rsa.DEVICE_Search(byref(numFound), deviceIDs, 
+        deviceSerial, deviceType)
+
+    if ret != 0:
+        print('Error in Search: ' + str(ret))
+        exit()
+    if numFound.value < 1:
+        print('No instruments found. Exiting script.')
+        exit()
+    elif numFound.value == 1:
+        print('One device found.')
+        print('Device type: {}'.format(deviceType.value))
+        print('Device serial number: {}'.format(deviceSerial.value))
+        ret = rsa.DEVICE_Connect(deviceIDs[0])
+        if ret != 0:
+            print('Error in Connect: ' + str(ret))
+            exit()
+    else:
+        print('2 or more instruments found. Enumerating instruments, please wait.')
+        for inst in xrange(numFound.value):
+            rsa.DEVICE_Connect(deviceIDs[inst])
+            rsa.DEVICE_GetSerialNumber(deviceSerial)
+            rsa.DEVICE_GetNomenclature(deviceType)
+            print('Device {}'.format(inst))
+            print('Device Type: {}'.format(deviceType.value))
+            print('Device serial number: {}'.format(deviceSerial.value))
+            rsa.DEVICE_Disconnect()
+        #note: the API can only currently access one at a time
+        selection = 1024
+        while (selection > numFound.value-1) or (selection < 0):
+            selection = int(input('Select device between 0 and {}\n> '.format(numFound.value-1)))
+        rsa.DEVICE_Connect(deviceIDs[selection])
+        return selection
+
+
+def main():
+    """#################INITIALIZE VARIABLES#################"""
+    #main SA parameters
+    refLevel = c_double(0)      #ref level
+    startFreq = 9e3             #sweep start frequency
+    stopFreq = 6.2e9            #sweep stop frequency
+    rbw = 300e3                 #resolution bandwidth
+    stepSpan = 40e6             #span of each step
+    numSweeps = 3
+
+
+    """#################SEARCH/CONNECT#################"""
+    search_connect()
+
+
+    """#################CONFIGURE INSTRUMENT#################"""
+    #everything goes through the shadowed state so that unchanged settings
+    #are never sent again
+    state = InstrumentState(rsa)
+    state.preset()
+    state.set(referenceLevel=refLevel.value)
+
+    #the sweep works out its steps and the stitched frequency array once
+    sweep = SpectrumSweep(rsa, startFreq, stopFreq, rbw, stepSpan, state=state)
+    sweep.configure()
+    print('Sweeping {} MHz to {} MHz in {} steps, {} points.'.format(
+        startFreq/1e6, stopFreq/1e6, len(sweep.centers), len(sweep.freq)))
+
+
+    """#################ACQUIRE/PROCESS DATA#################"""
+    for i in xrange(numSweeps):
+        freq, trace, sweepTime = sweep.sweep()
+        print('Sweep {} took {} seconds, {} seconds per step.'.format(i, 
+            sweepTime, sweepTime/len(sweep.centers)))
+
+    print('{} configuration calls made, {} skipped.'.format(state.applied, 
+        state.skipped))
+
+    peakPower = np.amax(trace)
+    peakPowerFreq = freq[np.argmax(trace)]
+    print('Peak power in sweep: %4.3f dBm @ %d Hz' % (peakPower, peakPowerFreq))
+
+
+    """#################SPECTRUM PLOT#################"""
+    plt.subplot(111, axisbg='k')
+    plt.plot(freq, trace, 'y')
+    plt.xlabel('Frequency (Hz)')
+    plt.ylabel('Amplitude (dBm)')
+    plt.title('Wideband Sweep')
+    plt.xlim(freq[0], freq[-1])
+    plt.show()
+
+    print('Disconnecting.')
+    rsa.DEVICE_Disconnect()
+
+if __name__ == "__main__":
+    main()